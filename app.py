@@ -1,42 +1,285 @@
-import json
 import os
+import json
 import math
-from flask import Flask, render_template, abort, request
-from dotenv import load_dotenv
-from operator import itemgetter
-
-# Load environment variables from .env file
-load_dotenv()
+import hashlib
+import time
+import hmac
+import threading
+import click
+from datetime import datetime, timezone
+from flask import Flask, render_template, abort, request, make_response, url_for, g, jsonify
+from config import config
+from perspective.store import ArticleStore
+from perspective.page_cache import PageCache
+from perspective.shared_cache import SharedPageCache
+from perspective.postprocess import PageOptimizer
+from perspective.assets import AssetManifest, send_early_hints
+from perspective.compression import CompressionMiddleware
+from perspective.metrics import MetricsRegistry, LATENCY_BUCKETS, SIZE_BUCKETS
+from perspective.profiler import SamplingProfiler
+from perspective.jsonlog import JSONLinesLogger
+from perspective import feeds, sitemap, templates
 
-# Initialize the Flask application
+# Initialize the Flask application. Settings (including SECRET_KEY) come
+# from config.py, which also loads the .env file; FLASK_ENV selects the
+# configuration class.
 app = Flask(__name__)
-# Set a secret key for session management, loaded from environment variables
-# with a default value for development.
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a-secure-development-secret-key')
+FLASK_ENV = os.environ.get('FLASK_ENV', 'default')
+if FLASK_ENV not in config:
+    raise RuntimeError(f"Unknown FLASK_ENV {FLASK_ENV!r}; use one of: {', '.join(sorted(config))}")
+app.config.from_object(config[FLASK_ENV])
+
+# Templates are compiled once per server, not once per worker: through the
+# on-disk bytecode cache, and in production from the bundle built by
+# `flask compile-templates` (used only for templates unchanged since).
+templates.configure(
+    app.jinja_env,
+    cache_dir=app.config['TEMPLATE_CACHE_DIR'],
+    bundle_dir=app.config['TEMPLATE_BUNDLE_DIR'],
+)
+if isinstance(app.jinja_env.loader, templates.BundleLoader):
+    # Loading from the bundle is only an import, so do it now: with
+    # Gunicorn's preload_app, workers are forked with every template ready.
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
 
 # Define the number of articles to display on each paginated page.
 ARTICLES_PER_PAGE = 2
 
-def load_articles():
+# Location of the article data, relative to this file so the app works
+# regardless of the directory Gunicorn is started from.
+ARTICLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'articles.json')
+
+# Related articles precomputed offline by `python -m perspective.related`.
+# When missing or out of date, the store computes them while loading.
+RELATED_FILE = os.path.join(os.path.dirname(ARTICLES_FILE), 'related.json')
+
+# Stamp file written by utils/rebuild_watcher.py after it has rebuilt the
+# derived files; when set, workers swap data versions on the stamp.
+RELOAD_STAMP = os.environ.get('RELOAD_STAMP')
+
+# The article store parses and sorts the JSON once and reloads it only when
+# the file changes. Rendered pages are cached per data version.
+store = ArticleStore(ARTICLES_FILE, related_path=RELATED_FILE, reload_stamp=RELOAD_STAMP)
+
+# With PAGE_CACHE_DIR set (Gunicorn uses /dev/shm), cached pages are also
+# written to a directory shared by all workers, so a page rendered once is
+# served by every worker and survives worker recycling.
+PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR')
+shared_page_cache = SharedPageCache(
+    PAGE_CACHE_DIR,
+    max_bytes=int(os.environ.get('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+) if PAGE_CACHE_DIR else None
+page_cache = PageCache(max_entries=int(os.environ.get('PAGE_CACHE_ENTRIES', 256)), shared=shared_page_cache)
+
+# Post-processing applied to every rendered page before it is cached:
+# critical CSS inlining plus HTML minification. Set OPTIMIZE_HTML=0 to
+# serve templates exactly as rendered (useful when editing them).
+OPTIMIZE_HTML = os.environ.get('OPTIMIZE_HTML', '1') != '0'
+page_optimizer = PageOptimizer(app.static_folder, app.static_url_path)
+
+# Pages carry `Link: rel=preload` headers for their stylesheet, fonts and
+# hero image. With EARLY_HINTS=1 the same links also go out as a 103 Early
+# Hints response before the page is built; this needs an HTTP/1.1 upstream
+# connection and a proxy that forwards 103s (see deployment/nginx.conf).
+asset_manifest = AssetManifest(app.static_folder, app.static_url_path)
+EARLY_HINTS = os.environ.get('EARLY_HINTS', '0') == '1'
+
+# Compress HTML and JSON responses with brotli or gzip. Cached pages carry
+# an ETag, so their compressed variants are built once and kept in the
+# page cache next to the uncompressed HTML.
+app.wsgi_app = CompressionMiddleware(
+    app.wsgi_app,
+    cache=page_cache,
+    min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+)
+
+# Per-request timing metrics, exposed at /metrics. Gunicorn sets METRICS_DIR
+# so every worker's numbers are merged; without it each process reports
+# only its own.
+metrics = MetricsRegistry(os.environ.get('METRICS_DIR'))
+metrics.counter('blog_requests_total', 'Requests handled, by endpoint and status code.')
+metrics.counter('blog_page_cache_total', 'Page cache lookups, by endpoint and result.')
+metrics.histogram('blog_request_duration_seconds', 'Time spent handling a request.', LATENCY_BUCKETS)
+metrics.histogram('blog_store_lookup_seconds', 'Time spent getting the article snapshot.', LATENCY_BUCKETS)
+metrics.histogram('blog_template_render_seconds', 'Time spent rendering and post-processing a template.', LATENCY_BUCKETS)
+metrics.histogram('blog_response_size_bytes', 'Uncompressed response body size.', SIZE_BUCKETS)
+
+# Opt-in sampling profiler. Started per worker with SIGUSR2 (installed by
+# the Gunicorn post_worker_init hook) or via POST /admin/profile, which is
+# only enabled when PROFILER_TOKEN is set.
+profiler = SamplingProfiler(
+    os.environ.get('PROFILER_DIR', '/tmp/daudi_blog_profiles'),
+    interval=float(os.environ.get('PROFILER_INTERVAL_MS', 10)) / 1000,
+    max_duration=float(os.environ.get('PROFILER_MAX_SECONDS', 60)),
+)
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+
+# Structured access log (JSON lines) written by a background thread, so a
+# slow disk never adds request latency. Disabled when ACCESS_LOG is unset.
+ACCESS_LOG = os.environ.get('ACCESS_LOG')
+access_log = JSONLinesLogger(
+    ACCESS_LOG,
+    policy=os.environ.get('ACCESS_LOG_POLICY', 'drop'),
+) if ACCESS_LOG else None
+
+# Feeds: the latest FEED_SIZE dated articles, site-wide and per category.
+# Absolute links in feeds and sitemaps always use SITE_URL, never the
+# request's Host header, which clients control.
+FEED_SIZE = int(os.environ.get('FEED_SIZE', 20))
+SITE_URL = app.config['SITE_URL']
+feed_builder = feeds.FeedBuilder()
+
+# Set once this worker has rendered its hot pages; see warm_cache().
+# Readiness waits for it only when a warmup was started (Gunicorn starts
+# one per worker); under `flask run` the worker is ready straight away.
+warmup = threading.Event()
+warmup_started = threading.Event()
+WARMUP_MAX_PAGES = int(os.environ.get('WARMUP_MAX_PAGES', 200))
+
+def current_snapshot():
+    """
+    Returns the store snapshot to serve the current request from.
+    
+    Routes read everything they need from one snapshot so a reload in the
+    middle of a request can't mix two data versions.
+    """
+    started = time.perf_counter()
+    store.refresh()
+    snapshot = store.snapshot
+    g.store_seconds = time.perf_counter() - started
+    if not request.environ.get('blog.warmup'):
+        metrics.observe('blog_store_lookup_seconds', g.store_seconds, endpoint=request.endpoint or 'none')
+    return snapshot
+
+def cached_response(cache_key, version, build, mimetype='text/html', last_modified=None):
+    """
+    Serves a response body through the page cache.
+    
+    On a miss `build()` produces the body, which is stored under the
+    current data version together with an ETag of its contents; on a hit
+    the stored result is returned as is. Requests carrying a matching
+    If-None-Match get a 304 without a body.
+    
+    Args:
+        cache_key (tuple): Identifies the page, e.g. ('article', 'linux').
+        version (str): Data version of the snapshot the content came from.
+        build (callable): Returns the body (str or bytes) on a cache miss.
+        mimetype (str): The response's content type.
+        last_modified (datetime): Sent as Last-Modified, enabling
+            If-Modified-Since revalidation.
+    """
+    entry = page_cache.get(cache_key, version)
+    g.cache_result = 'miss' if entry is None else 'hit'
+    if not request.environ.get('blog.warmup'):
+        metrics.inc('blog_page_cache_total', endpoint=request.endpoint or 'none', result=g.cache_result)
+    if entry is None:
+        body = build()
+        data = body if isinstance(body, bytes) else body.encode('utf-8')
+        etag = hashlib.sha1(data).hexdigest()[:16]
+        entry = (body, etag)
+        page_cache.set(cache_key, version, entry)
+    body, etag = entry
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response.make_conditional(request)
+
+def render_page(cache_key, version, template_name, hero_images=(), **context):
     """
-    Loads articles from the 'articles.json' file.
+    Renders a template through the page cache.
     
-    This function reads the JSON file, extracts the list of articles,
-    and sorts them in reverse chronological order based on their date.
-    This ensures that the newest articles appear first.
+    The rendered page is post-processed (critical CSS, minification)
+    before it is cached, so both steps run once per data version. The
+    response lists the page's critical resources in a Link header, and
+    sends them ahead as 103 Early Hints when EARLY_HINTS is enabled.
     
-    Returns:
-        list: A sorted list of article dictionaries. Returns an empty list if the file is not found.
+    Args:
+        cache_key (tuple): Identifies the page, e.g. ('article', 'linux').
+        version (str): Data version of the snapshot the context came from.
+        template_name (str): The template to render on a miss.
+        hero_images (list): Paths under static/ of the images shown above
+            the fold, to preload.
+        **context: Template variables.
     """
-    try:
-        with open('data/articles.json', 'r') as f:
-            data = json.load(f)
-            # Sort articles by date in descending order.
-            # This assumes the date format is consistent and sortable.
-            return sorted(data['articles'], key=itemgetter('date'), reverse=True)
-    except FileNotFoundError:
-        # If the articles file doesn't exist, return an empty list to avoid errors.
-        return []
+    links = asset_manifest.link_header(hero_images)
+    if EARLY_HINTS:
+        send_early_hints(request.environ, links)
+    def build():
+        started = time.perf_counter()
+        html = render_template(template_name, **context)
+        if OPTIMIZE_HTML:
+            html = page_optimizer.optimize(template_name, html)
+        g.render_seconds = time.perf_counter() - started
+        if not request.environ.get('blog.warmup'):
+            metrics.observe('blog_template_render_seconds', g.render_seconds, template=template_name)
+        return html
+    response = cached_response(cache_key, version, build)
+    if links:
+        response.headers['Link'] = links
+    return response
+
+def article_summary(article):
+    """
+    Returns the public metadata of an article for JSON responses.
+    
+    All values are precomputed by the store; nothing here touches the
+    article body.
+    """
+    return {
+        'id': article['id'],
+        'title': article['title'],
+        'category': article['category'],
+        'date': article.get('date'),
+        'url': url_for('article', article_id=article['id']),
+        'word_count': article['word_count'],
+        'reading_minutes': article['reading_minutes'],
+        'excerpt': article['excerpt'],
+        'toc': [{'anchor': anchor, 'title': title} for anchor, title in article['toc']],
+    }
+
+@app.before_request
+def start_timer():
+    """Records when the request started, for the duration metric."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Records metrics and an access log entry for every response."""
+    if request.environ.get('blog.warmup'):
+        return response
+    endpoint = request.endpoint or 'none'
+    started = g.get('request_started')
+    duration = time.perf_counter() - started if started is not None else None
+    if duration is not None:
+        metrics.observe('blog_request_duration_seconds', duration, endpoint=endpoint)
+    if response.content_length is not None:
+        metrics.observe('blog_response_size_bytes', response.content_length, endpoint=endpoint)
+    metrics.inc('blog_requests_total', endpoint=endpoint, status=str(response.status_code))
+    metrics.start_flusher()
+    if access_log is not None:
+        access_log.log({
+            'event': 'request',
+            'method': request.method,
+            'path': request.full_path if request.query_string else request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'bytes': response.content_length,
+            'duration_ms': _ms(duration),
+            'store_ms': _ms(g.get('store_seconds')),
+            'render_ms': _ms(g.get('render_seconds')),
+            'cache': g.get('cache_result'),
+            'remote_addr': request.headers.get('X-Real-IP', request.remote_addr),
+            'user_agent': request.user_agent.string,
+            'pid': os.getpid(),
+        })
+    return response
+
+def _ms(seconds):
+    """Converts seconds to milliseconds for log records, keeping None."""
+    return None if seconds is None else round(seconds * 1000, 3)
 
 @app.route('/')
 def index():
@@ -47,7 +290,8 @@ def index():
     It then calculates which articles to display for that page and determines
     the total number of pages needed.
     """
-    all_articles = load_articles()
+    snapshot = current_snapshot()
+    all_articles = snapshot.articles
     
     # Get the current page number from the URL query string (e.g., /?page=2).
     # Defaults to page 1 if not specified.
@@ -63,9 +307,20 @@ def index():
     # Calculate the total number of pages required to display all articles.
     total_pages = math.ceil(len(all_articles) / ARTICLES_PER_PAGE)
     
+    # Out-of-range pages are not pages; rendering (and caching) them would
+    # let anyone fill the page cache with empty listings.
+    if page < 1 or page > max(total_pages, 1):
+        abort(404)
+    
+    # The first article's image is the only one above the fold.
+    hero_images = ['images/' + a['image'] for a in paginated_articles if a.get('image')][:1]
+    
     # Render the index.html template, passing the necessary data to it.
-    return render_template(
-        'index.html', 
+    return render_page(
+        ('index', page),
+        snapshot.version,
+        'index.html',
+        hero_images=hero_images,
         articles=paginated_articles,
         page=page,
         total_pages=total_pages
@@ -79,25 +334,212 @@ def article(article_id):
     Args:
         article_id (str): The unique identifier for the article.
     """
-    articles = load_articles()
+    snapshot = current_snapshot()
     # Find the article with the matching ID.
-    article_data = next((a for a in articles if a['id'] == article_id), None)
+    article_data = snapshot.by_id.get(article_id)
     
     # If no article with the given ID is found, return a 404 Not Found error.
     if not article_data:
         abort(404)
     
     # Render the article.html template for the found article.
-    return render_template('article.html', article=article_data)
+    hero_images = ['images/' + article_data['image']] if article_data.get('image') else []
+    return render_page(('article', article_id), snapshot.version, 'article.html',
+                       hero_images=hero_images, article=article_data)
+
+@app.route('/api/articles')
+def api_articles():
+    """
+    Lists article metadata as JSON, newest first.
+    
+    Includes the derived fields (word count, reading time, excerpt and
+    table of contents) but not the article bodies.
+    """
+    snapshot = current_snapshot()
+    def build():
+        return json.dumps({
+            'version': snapshot.version,
+            'articles': [article_summary(a) for a in snapshot.articles],
+        })
+    return cached_response(('api', 'articles'), snapshot.version, build, mimetype='application/json')
+
+def site_base_url():
+    """Returns the absolute site URL (SITE_URL), ending in '/'."""
+    return SITE_URL if SITE_URL.endswith('/') else SITE_URL + '/'
+
+@app.route('/feed.xml', defaults={'kind': feeds.RSS, 'category': None})
+@app.route('/atom.xml', defaults={'kind': feeds.ATOM, 'category': None})
+@app.route('/feed.json', defaults={'kind': feeds.JSON_FEED, 'category': None})
+@app.route('/category/<category>/feed.xml', defaults={'kind': feeds.RSS})
+@app.route('/category/<category>/atom.xml', defaults={'kind': feeds.ATOM})
+@app.route('/category/<category>/feed.json', defaults={'kind': feeds.JSON_FEED})
+def feed(kind, category):
+    """
+    Serves the RSS, Atom or JSON feed of the latest articles.
+    
+    Each feed is serialized once per data version and served with ETag and
+    Last-Modified, so pollers that revalidate get a 304 without a body.
+    Last-Modified is the data file's modification time rather than the
+    newest entry's date, so editing an older article also updates it.
+    
+    Args:
+        kind (str): The feed format, set by the route.
+        category (str): Restricts the feed to one category, if given.
+    """
+    snapshot = current_snapshot()
+    base_url = site_base_url()
+    entries = feeds.feed_articles(list(snapshot.by_id.values()), FEED_SIZE, category)
+    if category and not entries:
+        abort(404)
+    last_modified = (datetime.fromtimestamp(snapshot.modified_at, timezone.utc)
+                     if snapshot.modified_at is not None else None)
+    title = feeds.SITE_TITLE if not category else '%s: %s' % (feeds.SITE_TITLE, entries[0]['category'])
+    feed_path = feeds.feed_path(kind, category)
+    def build():
+        return feed_builder.build(kind, entries, base_url, feed_path, title=title)
+    return cached_response(
+        ('feed', kind, (category or '').lower()),
+        snapshot.version,
+        build,
+        mimetype=feeds.MIMETYPES[kind],
+        last_modified=last_modified,
+    )
+
+def sitemap_files(snapshot, base_url):
+    """Returns all sitemap files for a snapshot, built once per data version."""
+    key = ('sitemap-files',)
+    files = page_cache.get(key, snapshot.version)
+    if files is None:
+        files = sitemap.build_sitemaps(list(snapshot.by_id.values()), base_url)
+        page_cache.set(key, snapshot.version, files)
+    return files
+
+@app.route('/sitemap.xml', defaults={'number': None})
+@app.route('/sitemap-<int:number>.xml.gz')
+def sitemap_xml(number):
+    """
+    Serves the sitemap, or one gzip-compressed shard of a large sitemap.
+    
+    Args:
+        number (int): Shard number, or None for sitemap.xml itself.
+    """
+    snapshot = current_snapshot()
+    base_url = site_base_url()
+    name = sitemap.INDEX_FILE if number is None else sitemap.shard_name(number)
+    files = sitemap_files(snapshot, base_url)
+    if name not in files:
+        abort(404)
+    mimetype = 'application/xml' if number is None else 'application/gzip'
+    return cached_response(('sitemap', name), snapshot.version, lambda: files[name], mimetype=mimetype)
+
+@app.cli.command('export-sitemap')
+@click.argument('output_dir')
+@click.option('--base-url', required=True, help='Absolute site URL, e.g. https://example.com/')
+def export_sitemap_command(output_dir, base_url):
+    """Write sitemap files to OUTPUT_DIR (skipped if the data is unchanged)."""
+    if not base_url.endswith('/'):
+        base_url += '/'
+    snapshot = store.snapshot
+    if sitemap.export_sitemaps(list(snapshot.by_id.values()), base_url, output_dir, snapshot.version):
+        click.echo(f"Sitemap for data version {snapshot.version} written to {output_dir}")
+    else:
+        click.echo(f"Sitemap in {output_dir} is already up to date")
+
+@app.cli.command('compile-templates')
+@click.argument('output_dir', required=False)
+def compile_templates_command(output_dir):
+    """Precompile all templates into a bundle (default: the production bundle directory)."""
+    output_dir = output_dir or app.config['TEMPLATE_BUNDLE_DIR'] or config['production'].TEMPLATE_BUNDLE_DIR
+    count = templates.build_bundle(app.jinja_env, output_dir, log=click.echo)
+    click.echo(f"Compiled {count} templates into {output_dir}")
+
+def store_metadata():
+    """
+    Describes the loaded data and cache state without touching the disk.
+    
+    Everything comes from the current snapshot and the warmup state, so
+    health probes cost microseconds however often they arrive.
+    """
+    snapshot = store.snapshot
+    return {
+        'data_version': snapshot.version,
+        'articles_count': len(snapshot.articles),
+        'last_reload': snapshot.loaded_at,
+        'cache_warm': warmup.is_set(),
+        'cached_pages': len(page_cache),
+        'shared_cache_hits': page_cache.shared_hits,
+    }
 
 @app.route('/health')
 def health_check():
     """
     A simple health check endpoint for monitoring services.
     
-    Returns a JSON response indicating the application's status and the number of articles.
+    Returns a JSON response indicating the application's status, the number
+    of articles and the state of the loaded data.
     """
-    return {'status': 'healthy', 'articles_count': len(load_articles())}
+    return {'status': 'healthy', **store_metadata()}
+
+@app.route('/health/live')
+def liveness():
+    """
+    Liveness probe: answers as long as the worker can serve requests.
+    """
+    return {'status': 'alive'}
+
+@app.route('/health/ready')
+def readiness():
+    """
+    Readiness probe: 503 while this worker is warming its page cache.
+    
+    Load balancers should route traffic to the instance only once this
+    returns 200, so rolling restarts don't send requests to cold workers.
+    Without a warmup (e.g. under `flask run`) the worker is always ready.
+    """
+    metadata = store_metadata()
+    if warmup_started.is_set() and not metadata['cache_warm']:
+        return {'status': 'warming', **metadata}, 503
+    return {'status': 'ready', **metadata}
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Exposes request metrics in the Prometheus text format.
+    
+    Restrict access to this path at the proxy; it is meant for the
+    monitoring system, not the public.
+    """
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """
+    Starts or stops the sampling profiler in the worker that serves this request.
+    
+    Requires 'Authorization: Bearer <PROFILER_TOKEN>' (403 otherwise; 404
+    when PROFILER_TOKEN is unset). POST with
+    action=start (and an optional duration in seconds) or action=stop;
+    GET reports whether a window is running and where the last one was
+    written.
+    """
+    if not PROFILER_TOKEN:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    # Compared as bytes: compare_digest() rejects non-ASCII str arguments.
+    if not hmac.compare_digest(supplied.encode('utf-8'), PROFILER_TOKEN.encode('utf-8')):
+        abort(403)
+    if request.method == 'POST':
+        action = request.values.get('action', 'start')
+        if action == 'start':
+            try:
+                profiler.start(request.values.get('duration', type=float))
+            except ValueError:
+                abort(400)
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            abort(400)
+    return jsonify(pid=os.getpid(), running=profiler.running, last_output=profiler.last_output)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -108,6 +550,37 @@ def not_found(error):
     """
     return render_template('base.html'), 404
 
+def warm_cache():
+    """
+    Renders the most visited pages into the page cache.
+
+    Covers the index pages, the article API and the site-wide feeds, then
+    the articles, up to WARMUP_MAX_PAGES in that order. Requests go through
+    the full app (with the preferred compression), but are marked so they
+    are left out of metrics and the access log. Sets `warmup` when done,
+    even if a page failed, so one bad article can't keep a worker out of
+    rotation.
+    """
+    try:
+        snapshot = store.snapshot
+        total_pages = math.ceil(len(snapshot.articles) / ARTICLES_PER_PAGE)
+        urls = ['/?page=%d' % page for page in range(1, total_pages + 1)]
+        urls.insert(0, '/')
+        # Few and hot, so ahead of the articles that the cap may cut off.
+        urls.extend(['/api/articles', '/feed.xml', '/atom.xml', '/feed.json'])
+        urls.extend('/article/%s' % article_id for article_id in snapshot.by_id)
+        client = app.test_client()
+        for url in urls[:WARMUP_MAX_PAGES]:
+            client.get(url, headers={'Accept-Encoding': 'br, gzip'}, environ_base={'blog.warmup': True})
+    finally:
+        warmup.set()
+
+def start_warmup():
+    """Warms the page cache in a background thread."""
+    warmup_started.set()
+    threading.Thread(target=warm_cache, name='cache-warmup', daemon=True).start()
+
 # This block runs the application in debug mode when the script is executed directly.
 if __name__ == '__main__':
+    start_warmup()
     app.run(debug=True, host='0.0.0.0', port=5003)
@@ -3,14 +3,25 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    # Compiled templates are cached here and shared by all worker processes.
+    # Unset means a private per-user directory in the system temp directory.
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
+    # Precompiled template bundle written by `flask compile-templates`.
+    TEMPLATE_BUNDLE_DIR = None
+    # Public address of the site, used for absolute links in feeds and
+    # sitemaps. The default matches the development server in app.py.
+    SITE_URL = os.environ.get('SITE_URL') or 'http://localhost:5003/'
     
 class DevelopmentConfig(Config):
     DEBUG = True
     
 class ProductionConfig(Config):
     DEBUG = False
+    TEMPLATE_BUNDLE_DIR = os.environ.get('TEMPLATE_BUNDLE_DIR') or os.path.join(basedir, 'build', 'templates')
     
 class TestingConfig(Config):
     TESTING = True
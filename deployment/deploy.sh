@@ -55,9 +55,20 @@ if [ ! -f .env ]; then
 FLASK_APP=app.py
 FLASK_ENV=production
 SECRET_KEY=$(python3 -c 'import secrets; print(secrets.token_hex(16))')
+SITE_URL=${SITE_URL:-https://your-domain.com/}
 EOF
 fi
 
+# Precompile the templates; production workers load them from this bundle.
+echo "🧩 Compiling templates..."
+flask --app app compile-templates
+
+# Fail the deployment if a cold worker no longer starts within budget.
+# Measured with the production configuration (template bundle, no debug),
+# which is what Gunicorn runs; .env is only read by the flask CLI.
+echo "⏱️ Checking startup time..."
+FLASK_ENV=production STARTUP_BUDGET_MS=${STARTUP_BUDGET_MS:-1500} python -m perspective.startup
+
 # Set up Supervisor for process management
 echo "👮 Setting up Supervisor..."
 sudo tee /etc/supervisor/conf.d/daudi_blog.conf > /dev/null << EOF
@@ -65,12 +76,42 @@ sudo tee /etc/supervisor/conf.d/daudi_blog.conf > /dev/null << EOF
 command=$APP_DIR/venv/bin/gunicorn --config $APP_DIR/deployment/gunicorn.conf.py app:app
 directory=$APP_DIR
 user=www-data
+environment=RELOAD_STAMP="$APP_DIR/data/.reload-stamp"
 autostart=true
 autorestart=true
 redirect_stderr=true
 stdout_logfile=/var/log/gunicorn/daudi_blog.log
 EOF
 
+# Recurring jobs (reminders, header images, cache warmups) run in one daemon.
+# SMTP_SERVER, REMINDER_TO etc. can be added to its environment; see README.
+sudo tee /etc/supervisor/conf.d/daudi_blog_scheduler.conf > /dev/null << EOF
+[program:daudi_blog_scheduler]
+command=$APP_DIR/venv/bin/python utils/weekly_scheduler.py daemon
+directory=$APP_DIR
+user=www-data
+environment=WARMUP_URL="http://127.0.0.1:8000/",REMINDER_LOG="/var/log/gunicorn/blog_reminders.log"
+autostart=true
+autorestart=true
+stopsignal=TERM
+redirect_stderr=true
+stdout_logfile=/var/log/gunicorn/daudi_blog_scheduler.log
+EOF
+
+# Rebuilds derived files when data/ or static/images/ change, then moves
+# the workers to the new data version through the reload stamp.
+sudo tee /etc/supervisor/conf.d/daudi_blog_watcher.conf > /dev/null << EOF
+[program:daudi_blog_watcher]
+command=$APP_DIR/venv/bin/python utils/rebuild_watcher.py watch
+directory=$APP_DIR
+user=www-data
+environment=RELOAD_STAMP="$APP_DIR/data/.reload-stamp"
+autostart=true
+autorestart=true
+redirect_stderr=true
+stdout_logfile=/var/log/gunicorn/daudi_blog_watcher.log
+EOF
+
 # Set up Nginx
 echo "🌐 Setting up Nginx..."
 sudo cp deployment/nginx.conf /etc/nginx/sites-available/daudi_blog
@@ -89,7 +130,7 @@ sudo chmod -R 755 $APP_DIR
 echo "🚀 Starting services..."
 sudo supervisorctl reread
 sudo supervisorctl update
-sudo supervisorctl start daudi_blog
+sudo supervisorctl start daudi_blog daudi_blog_scheduler daudi_blog_watcher
 sudo systemctl restart nginx
 sudo systemctl enable nginx
 sudo systemctl enable supervisor
@@ -111,7 +152,7 @@ echo "📊 Check status with: sudo supervisorctl status daudi_blog"
 echo "📝 View logs with: sudo tail -f /var/log/gunicorn/daudi_blog.log"
 echo ""
 echo "🔧 Next steps:"
-echo "1. Update your domain name in deployment/nginx.conf"
+echo "1. Update your domain name in deployment/nginx.conf and SITE_URL in .env"
 echo "2. Set up SSL certificate with Let's Encrypt"
 echo "3. Add your article images to static/images/"
 echo "4. Test the weekly update system"
@@ -1,5 +1,7 @@
 # Gunicorn configuration file for production deployment
 
+import os
+
 # Server socket
 # Bind to all network interfaces on port 8000.
 bind = "0.0.0.0:8000"
@@ -18,9 +20,19 @@ keepalive = 2
 max_requests = 1000
 max_requests_jitter = 100
 
+# Import the application once in the master and fork workers from it, so a
+# new or recycled worker starts with Flask, the templates and the article
+# data already loaded instead of paying the import cost again (measure it
+# with `python -m perspective.startup`). Code changes need a full restart.
+preload_app = True
+os.environ.setdefault("FLASK_ENV", "production")
+
 # Logging
-# Define paths for access and error logs.
-accesslog = "/var/log/gunicorn/access.log"
+# The app writes its own structured access log (JSON lines with per-request
+# timings) from a background thread; Gunicorn's synchronous access log is
+# turned off so request workers never wait on log writes.
+accesslog = None
+os.environ.setdefault("ACCESS_LOG", "/var/log/gunicorn/access.jsonl")
 errorlog = "/var/log/gunicorn/error.log"
 loglevel = "info"
 
@@ -34,3 +46,57 @@ pidfile = "/var/run/gunicorn/daudi_blog.pid"
 user = "www-data"
 group = "www-data"
 tmp_upload_dir = None
+
+# Metrics
+# Workers write their request metrics to this directory so /metrics can
+# report totals for the whole server rather than for one worker (tmpfs, so
+# the periodic writes never wait on a disk).
+metrics_dir = os.environ.setdefault(
+    "METRICS_DIR",
+    "/dev/shm/daudi_blog_metrics" if os.path.isdir("/dev/shm") else "/tmp/daudi_blog_metrics",
+)
+
+# Shared page cache
+# Rendered pages are shared between workers through files in this directory
+# (tmpfs, so reads come from memory). PAGE_CACHE_MAX_BYTES caps its size.
+page_cache_dir = os.environ.setdefault(
+    "PAGE_CACHE_DIR",
+    "/dev/shm/daudi_blog_pages" if os.path.isdir("/dev/shm") else "/tmp/daudi_blog_pages",
+)
+
+def on_starting(server):
+    """Start every server run with empty metrics and page cache.
+
+    Cached pages are only valid for the code that rendered them, so the
+    shared cache is emptied whenever the server (re)starts.
+    """
+    from perspective.metrics import reset_directory
+    from perspective.shared_cache import clear_directory
+    # Workers drop to `user` when started as root, and only use directories
+    # that user owns (mode 0700).
+    owner, group = (server.cfg.uid, server.cfg.gid) if os.getuid() == 0 else (None, None)
+    reset_directory(metrics_dir, owner, group)
+    clear_directory(page_cache_dir, owner, group)
+
+def post_worker_init(worker):
+    """Warm the page cache and let SIGUSR2 toggle the sampling profiler.
+
+    /health/ready reports 503 while the warmup is running. Send USR2 to
+    a worker PID, never to the master (USR2 there upgrades the binary):
+    kill -USR2 <worker pid>. Profiles go to PROFILER_DIR.
+    """
+    from app import profiler, start_warmup
+    start_warmup()
+    profiler.install_signal_handler()
+
+def worker_exit(server, worker):
+    """Write the exiting worker's final metrics and queued log records."""
+    from app import metrics, access_log
+    metrics.flush()
+    if access_log is not None:
+        access_log.close()
+
+def child_exit(server, worker):
+    """Fold a recycled worker's metrics into the archive file."""
+    from perspective.metrics import archive_worker
+    archive_worker(metrics_dir, worker.pid)
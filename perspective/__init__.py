@@ -0,0 +1,19 @@
+"""
+Supporting modules for the Daudi's Perspective Flask application.
+
+The web entry point stays in app.py; this package holds the pieces it is
+built from:
+
+- Content: the article store (store), the body compiler (content), the
+  related-articles engine (related), feeds (feeds) and sitemaps (sitemap).
+- Serving: per-worker and shared page caches (page_cache, shared_cache),
+  output post-processing (postprocess), response compression
+  (compression), template bytecode caching (templates) and preload hints
+  (assets).
+- Operations: request metrics (metrics), the sampling profiler
+  (profiler), the JSON access log (jsonlog), the startup time budget
+  (startup) and private working directories (paths).
+- Background jobs: a timer loop for recurring jobs (scheduler), outgoing
+  mail (mailer) and the directory watcher behind utils/rebuild_watcher.py
+  (watcher).
+"""
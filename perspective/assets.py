@@ -0,0 +1,163 @@
+"""
+Preload hints for the resources every page needs first.
+
+A browser only discovers the stylesheet, the fonts and the hero image of a
+page after it has received and parsed the HTML. Listing them in a `Link`
+header lets it start those fetches as soon as the response headers arrive,
+and a 103 Early Hints response sent ahead of the page lets it start even
+before the server has finished building the page.
+
+- AssetManifest knows which files exist under static/. It scans the folder
+  once and rescans only when a directory in it changes (checked at most
+  every `check_interval` seconds), so a hint never points at a missing file.
+- The Link value for a page is the site-wide resources from the <head> of
+  templates/base.html plus the page's hero image. Values are cached per
+  hero image until the next rescan, so serving one is a dict lookup.
+- send_early_hints() writes the 103 response straight to the client socket
+  that Gunicorn exposes to the application. WSGI has no interface for
+  informational responses; only HTTP/1.1 requests get one, as HTTP/1.0
+  clients (and nginx's default upstream protocol) do not expect them.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from urllib.parse import quote
+
+# Resources loaded from the <head> of templates/base.html; keep the two in
+# step, as a hint only helps when its URL matches the one in the page.
+# Each entry is (URL, or a path under static/; rel; `as` destination).
+HEAD_RESOURCES = [
+    ('https://fonts.gstatic.com', 'preconnect', None),
+    ('https://cdn.tailwindcss.com', 'preload', 'script'),
+    ('https://fonts.googleapis.com/css2?family=Lora:ital,wght@0,400;0,700'
+     '&family=Lato:wght@400;700&display=swap', 'preload', 'style'),
+    ('css/site.css', 'preload', 'style'),
+]
+# Fonts are fetched in CORS mode, so the connection for them must be too.
+_CROSSORIGIN = {'https://fonts.gstatic.com'}
+
+
+def link_value(url: str, rel: str, as_: Optional[str] = None, **params: str) -> str:
+    """Formats one entry of a Link header (RFC 8288)."""
+    parts = [f'<{url}>', f'rel={rel}']
+    if as_:
+        parts.append(f'as={as_}')
+    if url in _CROSSORIGIN:
+        parts.append('crossorigin')
+    parts.extend(f'{name}={value}' for name, value in params.items())
+    return '; '.join(parts)
+
+
+class AssetManifest:
+    """The files under the static folder, and the Link headers built from them."""
+
+    def __init__(self, static_folder: str, static_url_path: str = '/static',
+                 check_interval: float = 2.0):
+        """
+        Args:
+            static_folder (str): Filesystem path of the app's static folder.
+            static_url_path (str): URL prefix under which it is served.
+            check_interval (float): Minimum seconds between checks for
+                added or removed files.
+        """
+        self.static_folder = static_folder
+        self.static_url_path = static_url_path.rstrip('/') + '/'
+        self.check_interval = check_interval
+        self._files: FrozenSet[str] = frozenset()
+        self._dir_key: Optional[Tuple] = None
+        self._checked = float('-inf')
+        self._links: Dict[Tuple[str, ...], str] = {}
+        self._lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        """The URL of a file under the static folder, as url_for('static') builds it."""
+        return self.static_url_path + quote(path)
+
+    def _directories(self) -> Iterable[str]:
+        for directory, _, _ in os.walk(self.static_folder):
+            yield directory
+
+    def _stat_dirs(self, directories: Iterable[str]) -> Tuple:
+        key = []
+        for directory in directories:
+            try:
+                key.append((directory, os.stat(directory).st_mtime_ns))
+            except FileNotFoundError:
+                key.append((directory, None))
+        return tuple(key)
+
+    def refresh(self) -> None:
+        """Rescans the static folder if a file was added or removed in it."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.check_interval:
+                return
+            # Adding, removing or renaming a file changes its directory's
+            # mtime, so a stat() per directory is enough to notice.
+            dirs = [directory for directory, _ in self._dir_key] if self._dir_key else []
+            if self._dir_key is None or self._stat_dirs(dirs) != self._dir_key:
+                files = set()
+                for directory, _, names in os.walk(self.static_folder):
+                    relative = os.path.relpath(directory, self.static_folder)
+                    for name in names:
+                        files.add(name if relative == '.' else f'{relative}/{name}'.replace(os.sep, '/'))
+                self._files = frozenset(files)
+                self._dir_key = self._stat_dirs(list(self._directories()))
+                self._links = {}
+            self._checked = now
+
+    def __contains__(self, path: str) -> bool:
+        self.refresh()
+        return path in self._files
+
+    def link_header(self, hero_images: Iterable[str] = ()) -> str:
+        """
+        Returns the Link header value for a page.
+
+        Args:
+            hero_images (list): Paths under static/ of the images shown
+                above the fold, most important first.
+        """
+        self.refresh()
+        key = tuple(hero_images)
+        value = self._links.get(key)
+        if value is None:
+            links = []
+            for target, rel, as_ in HEAD_RESOURCES:
+                if '://' in target:
+                    links.append(link_value(target, rel, as_))
+                elif target in self._files:
+                    links.append(link_value(self.url(target), rel, as_))
+            links.extend(link_value(self.url(image), 'preload', 'image', fetchpriority='high')
+                         for image in key if image in self._files)
+            value = ', '.join(links)
+            # Bounded by the number of distinct pages; drop everything
+            # rather than track ages if something unexpected floods it.
+            if len(self._links) >= 4096:
+                self._links = {}
+            self._links[key] = value
+        return value
+
+
+def send_early_hints(environ: dict, link_header: str) -> bool:
+    """
+    Sends a 103 Early Hints response ahead of the real one.
+
+    Only possible under Gunicorn's sync worker, which puts the client
+    socket in the WSGI environ; elsewhere this does nothing.
+
+    Returns:
+        bool: Whether the hints were sent.
+    """
+    sock = environ.get('gunicorn.socket')
+    if sock is None or not link_header or environ.get('SERVER_PROTOCOL') != 'HTTP/1.1':
+        return False
+    try:
+        sock.sendall(b'HTTP/1.1 103 Early Hints\r\nLink: ' + link_header.encode('latin-1') + b'\r\n\r\n')
+    except (OSError, UnicodeEncodeError):
+        return False
+    return True
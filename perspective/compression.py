@@ -0,0 +1,235 @@
+"""
+WSGI middleware that compresses responses according to Accept-Encoding.
+
+Responses that carry an ETag are compressed once per ETag and encoding and
+the compressed bytes are kept in the page cache, so a hot page costs one
+gzip/brotli pass per content version instead of one per request.
+Responses without an ETag are compressed on the fly.
+
+Each encoded variant gets its own ETag (the original value with an
+'-gzip' or '-br' suffix) and every compressible response carries
+'Vary: Accept-Encoding', so shared caches never hand a compressed body to
+a client that did not ask for it. Conditional requests are translated
+back to the application's own ETag before it sees them, but only for the
+variant this request negotiated: a client that can't decode gzip never
+gets a 304 for the gzip variant.
+"""
+
+import gzip
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available.
+    brotli = None
+
+from perspective.page_cache import PageCache
+
+# Content types worth compressing. Images and fonts are already compressed.
+COMPRESSIBLE_TYPES = (
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/xml',
+    'application/json',
+    'application/xml',
+    'application/javascript',
+    'application/rss+xml',
+    'application/atom+xml',
+    'application/feed+json',
+)
+
+# Server preference when the client accepts several encodings equally.
+ENCODING_PREFERENCE = ('br', 'gzip')
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """
+    Parses an Accept-Encoding header into a {coding: q-value} mapping.
+
+    Example:
+        'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}
+    """
+    accepted = {}
+    for item in header.split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: str, available: Iterable[str]) -> Optional[str]:
+    """
+    Picks the best content coding for a request.
+
+    Returns:
+        str: 'br' or 'gzip', or None when the response should stay identity.
+    """
+    accepted = parse_accept_encoding(header or '')
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _with_suffix(etag: str, encoding: str) -> str:
+    """Appends the encoding to an ETag value, keeping quotes and weakness."""
+    if etag.endswith('"'):
+        return '%s-%s"' % (etag[:-1], encoding)
+    return '%s-%s' % (etag, encoding)
+
+
+class CompressionMiddleware:
+    """Negotiates and applies gzip/brotli compression for a WSGI app."""
+
+    def __init__(self, app, cache: Optional[PageCache] = None, min_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 5):
+        """
+        Args:
+            app: The wrapped WSGI application.
+            cache (PageCache): Where compressed variants are stored. Without
+                one, every response is compressed on the fly.
+            min_size (int): Bodies smaller than this are sent uncompressed;
+                below roughly one packet compression saves nothing.
+            gzip_level (int): zlib compression level (1-9).
+            brotli_quality (int): Brotli quality (0-11).
+        """
+        self.app = app
+        self.cache = cache
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = tuple(e for e in ENCODING_PREFERENCE if e != 'br' or brotli is not None)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compresses `body` with the given content coding."""
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        # mtime=0 keeps the output deterministic for identical input.
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        stripped_suffix = self._strip_conditional_suffix(environ, encoding)
+
+        captured = {}
+
+        def _capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return lambda data: None  # write() is unused by Flask apps
+
+        app_iter = self.app(environ, _capture)
+        status = captured['status']
+        headers = captured['headers']
+
+        if status.startswith('304'):
+            # The client holds the negotiated variant (suffix stripped) or
+            # the identity one; echo back the ETag of that variant.
+            if stripped_suffix:
+                headers = self._rewrite_etag(headers, stripped_suffix)
+            headers = self._add_vary(headers)
+            start_response(status, headers)
+            return app_iter
+
+        if not self._is_compressible(status, headers):
+            start_response(status, headers, captured['exc_info'])
+            return app_iter
+
+        headers = self._add_vary(headers)
+        content_length = _get_header(headers, 'Content-Length')
+        if encoding is None or (content_length is not None and int(content_length) < self.min_size):
+            start_response(status, headers, captured['exc_info'])
+            return app_iter
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        if len(body) < self.min_size or environ.get('REQUEST_METHOD') == 'HEAD':
+            start_response(status, headers, captured['exc_info'])
+            return [body]
+
+        compressed = self._compressed_body(headers, body, encoding)
+        headers = [(k, v) for k, v in headers if k.lower() != 'content-length']
+        headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(len(compressed))))
+        headers = self._rewrite_etag(headers, encoding)
+        start_response(status, headers, captured['exc_info'])
+        return [compressed]
+
+    def _compressed_body(self, headers, body: bytes, encoding: str) -> bytes:
+        """Returns the compressed body, reusing a cached copy when the ETag matches."""
+        etag = _get_header(headers, 'ETag')
+        if self.cache is None or etag is None:
+            return self.compress(body, encoding)
+        # Keyed on the content, not the URL, so query strings the app
+        # ignores can't add copies of the same body.
+        key = ('compressed', etag, encoding)
+        compressed = self.cache.get(key, etag)
+        if compressed is None:
+            compressed = self.compress(body, encoding)
+            self.cache.set(key, etag, compressed)
+        return compressed
+
+    def _is_compressible(self, status: str, headers: List[Tuple[str, str]]) -> bool:
+        if not status.startswith('200'):
+            return False
+        if _get_header(headers, 'Content-Encoding') is not None:
+            return False
+        content_type = (_get_header(headers, 'Content-Type') or '').split(';', 1)[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _strip_conditional_suffix(self, environ, encoding: Optional[str]) -> Optional[str]:
+        """
+        Maps If-None-Match ETags of the negotiated variant back to the app's ETags.
+
+        Tags of other encodings are left alone, so they never match.
+
+        Returns:
+            str: The encoding suffix that was removed, if any.
+        """
+        header = environ.get('HTTP_IF_NONE_MATCH')
+        if not header or encoding is None:
+            return None
+        suffix = '-%s"' % encoding
+        if suffix not in header:
+            return None
+        environ['HTTP_IF_NONE_MATCH'] = header.replace(suffix, '"')
+        return encoding
+
+    @staticmethod
+    def _rewrite_etag(headers: List[Tuple[str, str]], encoding: str) -> List[Tuple[str, str]]:
+        return [(k, _with_suffix(v, encoding) if k.lower() == 'etag' else v) for k, v in headers]
+
+    @staticmethod
+    def _add_vary(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        vary = _get_header(headers, 'Vary')
+        if vary is None:
+            return headers + [('Vary', 'Accept-Encoding')]
+        if 'accept-encoding' in vary.lower() or vary.strip() == '*':
+            return headers
+        return [(k, '%s, Accept-Encoding' % v if k.lower() == 'vary' else v) for k, v in headers]
+
+
+def _get_header(headers: List[Tuple[str, str]], name: str) -> Optional[str]:
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
@@ -0,0 +1,327 @@
+"""
+Article content compiler.
+
+Articles store their body as a list of plain strings, some of which carry
+inline HTML (<strong>, links) and some of which are really section
+headings ("The Vibe in the Room") or source list items ("* Source ...").
+The compiler runs once per article when the store loads and turns that
+list into a single sanitized HTML fragment:
+
+- headings ("## " lines, or short Title Case lines) become <h2> elements
+  with stable anchor IDs,
+- runs of "* " / "- " lines become a <ul>,
+- everything else becomes a <p>,
+- inline HTML is filtered through a small allowlist; anything else is
+  escaped, and <script>/<style> blocks are dropped with their contents.
+
+Templates then insert the cached Markup in one go instead of looping over
+paragraphs and trusting them with |safe.
+
+The same pass derives the listing metadata (word count, reading time, a
+sentence-bounded excerpt and a table of contents built from the headings),
+so none of it is ever computed in a template or per request.
+"""
+
+import html
+import math
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple
+
+from markupsafe import Markup
+
+# Inline tags authors may use, with the attributes each one may carry.
+ALLOWED_TAGS = {
+    'a': ('href', 'title'),
+    'abbr': ('title',),
+    'b': (),
+    'br': (),
+    'code': (),
+    'em': (),
+    'i': (),
+    'small': (),
+    'strong': (),
+    'sub': (),
+    'sup': (),
+}
+VOID_TAGS = {'br'}
+# Tags whose text content must never reach the page.
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template'}
+ALLOWED_URL_SCHEMES = ('http:', 'https:', 'mailto:')
+
+LIST_MARKERS = ('* ', '- ', '• ')
+HEADING_MARKER = '## '
+# Without the marker, a heading is a short Title Case line without
+# sentence punctuation at the end; a one-word line only when it is a
+# conventional section title, so replies like "OK" stay paragraphs.
+HEADING_MAX_CHARS = 80
+HEADING_MAX_WORDS = 12
+_SENTENCE_END = tuple('.!?;:,"\'”’)')
+# Words Title Case leaves in lower case.
+TITLE_MINOR_WORDS = frozenset(
+    'a an and as at but by for from in into nor of on or the to vs with'.split())
+SECTION_TITLES = frozenset(
+    'acknowledgements acknowledgments conclusion epilogue introduction notes '
+    'postscript prologue references sources summary update'.split())
+# Abbreviations whose period does not end a sentence.
+ABBREVIATIONS = frozenset(
+    'approx dr e.g fig i.e inc jr ltd mr mrs ms mt prof sr st vs'.split())
+
+# Average adult silent reading speed for non-fiction prose.
+WORDS_PER_MINUTE = 230
+EXCERPT_MAX_CHARS = 280
+
+_TAG_STRIP_RE = re.compile(r'<[^>]+>')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["”’)])\s+')
+_SLUG_STRIP_RE = re.compile(r'[^a-z0-9]+')
+_LAST_WORD_RE = re.compile(r'(\S+)\.$')
+
+
+class Block(NamedTuple):
+    """One classified paragraph of an article."""
+    kind: str  # 'heading', 'list_item' or 'body'
+    text: str  # Plain text, tags stripped
+    html: str  # Sanitized inner HTML
+    anchor: str  # Element ID for headings, '' otherwise
+
+
+class _Sanitizer(HTMLParser):
+    """Re-serializes an HTML fragment, keeping only allowlisted markup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.open_tags: List[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None:
+                continue
+            if name == 'href' and not _is_safe_url(value):
+                continue
+            kept.append(' %s="%s"' % (name, html.escape(value, quote=True)))
+        if tag == 'a':
+            kept.append(' rel="noopener"')
+        self.out.append('<%s%s>' % (tag, ''.join(kept)))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element to keep nesting valid.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append('</%s>' % open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        self.out.extend('</%s>' % tag for tag in reversed(self.open_tags))
+        self.open_tags = []
+        return ''.join(self.out)
+
+
+def _is_safe_url(url: str) -> bool:
+    url = url.strip().lower()
+    if url.startswith(('/', '#')):
+        return True
+    return url.startswith(ALLOWED_URL_SCHEMES)
+
+
+def sanitize_html(fragment: str) -> str:
+    """
+    Filters an inline HTML fragment through the tag allowlist.
+
+    Args:
+        fragment (str): Paragraph text that may contain inline HTML.
+
+    Returns:
+        str: Safe HTML; disallowed tags are removed and their text escaped.
+    """
+    parser = _Sanitizer()
+    parser.feed(fragment)
+    return parser.result()
+
+
+def strip_tags(fragment: str) -> str:
+    """Returns the plain text of an HTML fragment."""
+    return html.unescape(_TAG_STRIP_RE.sub('', fragment)).strip()
+
+
+def slugify(text: str) -> str:
+    """Turns heading text into an anchor ID, e.g. 'A Digital Identity' -> 'a-digital-identity'."""
+    return _SLUG_STRIP_RE.sub('-', text.lower()).strip('-') or 'section'
+
+
+def classify_paragraph(paragraph: str) -> str:
+    """
+    Decides how a content paragraph should be rendered.
+
+    Returns:
+        str: 'list_item', 'heading' or 'body'.
+    """
+    stripped = paragraph.strip()
+    if stripped.startswith(LIST_MARKERS):
+        return 'list_item'
+    if stripped.startswith(HEADING_MARKER):
+        return 'heading'
+    words = stripped.split()
+    if (
+        len(stripped) <= HEADING_MAX_CHARS
+        and len(words) <= HEADING_MAX_WORDS
+        and '<' not in stripped
+        and not stripped.endswith(_SENTENCE_END)
+        and stripped[:1].isupper()
+        and _is_title_case(words)
+    ):
+        return 'heading'
+    return 'body'
+
+
+def _is_title_case(words: List[str]) -> bool:
+    if len(words) == 1:
+        return words[0].lower() in SECTION_TITLES
+    return all(not word[:1].isalpha() or word[:1].isupper() or word.lower() in TITLE_MINOR_WORDS
+               for word in words)
+
+
+def classify_blocks(paragraphs: List[str]) -> List[Block]:
+    """Classifies and sanitizes every paragraph of an article."""
+    blocks = []
+    anchors: Dict[str, int] = {}
+    for paragraph in paragraphs:
+        kind = classify_paragraph(paragraph)
+        text = paragraph.strip()
+        if kind == 'list_item' or text.startswith(HEADING_MARKER):
+            text = text[2:].strip()
+        inner = sanitize_html(text)
+        anchor = ''
+        if kind == 'heading':
+            anchor = slugify(strip_tags(inner))
+            # Keep anchors unique when two sections share a title.
+            count = anchors.get(anchor, 0)
+            anchors[anchor] = count + 1
+            if count:
+                anchor = '%s-%d' % (anchor, count + 1)
+        blocks.append(Block(kind, strip_tags(inner), inner, anchor))
+    return blocks
+
+
+def render_blocks(blocks: List[Block]) -> Markup:
+    """Serializes classified blocks into one HTML fragment."""
+    parts = []
+    in_list = False
+    for block in blocks:
+        if block.kind == 'list_item':
+            if not in_list:
+                parts.append('<ul>')
+                in_list = True
+            parts.append('<li>%s</li>' % block.html)
+            continue
+        if in_list:
+            parts.append('</ul>')
+            in_list = False
+        if block.kind == 'heading':
+            parts.append('<h2 id="%s">%s</h2>' % (block.anchor, block.html))
+        else:
+            parts.append('<p>%s</p>' % block.html)
+    if in_list:
+        parts.append('</ul>')
+    return Markup(''.join(parts))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits plain text into sentences, keeping "Dr. Ngugi" or "J. Smith" together."""
+    sentences: List[str] = []
+    for piece in _SENTENCE_SPLIT_RE.split(text):
+        if not piece:
+            continue
+        if sentences and _ends_with_abbreviation(sentences[-1]):
+            sentences[-1] += ' ' + piece
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def _ends_with_abbreviation(sentence: str) -> bool:
+    match = _LAST_WORD_RE.search(sentence)
+    if match is None:
+        return False
+    word = match.group(1).lstrip('("“‘')
+    # A single capital letter is an initial (but "I" is a word).
+    return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper() and word != 'I')
+
+
+def make_excerpt(blocks: List[Block], max_chars: int = EXCERPT_MAX_CHARS) -> str:
+    """
+    Builds a plain-text excerpt that ends on a sentence boundary.
+
+    Whole sentences are taken from the body paragraphs until the next one
+    would exceed `max_chars`. If even the first sentence is too long it is
+    cut at a word boundary and ends with an ellipsis.
+    """
+    sentences = []
+    for block in blocks:
+        if block.kind == 'body':
+            sentences.extend(split_sentences(block.text))
+        if sum(len(s) + 1 for s in sentences) > max_chars:
+            break
+    excerpt = ''
+    for sentence in sentences:
+        candidate = ('%s %s' % (excerpt, sentence)).strip()
+        if len(candidate) > max_chars:
+            break
+        excerpt = candidate
+    if excerpt or not sentences:
+        return excerpt
+    cut = sentences[0][:max_chars].rsplit(' ', 1)[0]
+    return cut.rstrip(',;:—- ') + '…'
+
+
+# The keys compile_article() adds; they depend only on the article's source.
+COMPILED_FIELDS = ('blocks', 'body_html', 'word_count', 'reading_minutes', 'excerpt', 'toc')
+
+
+def compile_article(article: Dict) -> None:
+    """
+    Adds the compiled body and derived metadata to an article in place.
+
+    Sets:
+        blocks (list): The classified paragraphs.
+        body_html (Markup): The full sanitized article body.
+        word_count (int): Words across all paragraphs.
+        reading_minutes (int): Estimated reading time, at least one minute.
+        excerpt (str): Plain-text summary for listings and feeds.
+        toc (list): (anchor, title) pairs for the section headings.
+    """
+    blocks = classify_blocks(article.get('content') or [])
+    word_count = sum(len(b.text.split()) for b in blocks)
+    article['blocks'] = blocks
+    article['body_html'] = render_blocks(blocks)
+    article['word_count'] = word_count
+    article['reading_minutes'] = max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+    article['excerpt'] = make_excerpt(blocks)
+    article['toc'] = [(b.anchor, b.text) for b in blocks if b.kind == 'heading']
@@ -0,0 +1,180 @@
+"""
+RSS 2.0, Atom 1.0 and JSON Feed 1.1 generation.
+
+Feeds are assembled from per-article fragments. Each fragment is cached
+under the article's revision (a hash of its source fields), so when the
+data file changes only the articles that were edited or added are
+serialized again; the rest of the feed is a string join. The finished
+feed is cached by the app per data version like any other page.
+"""
+
+import json
+from datetime import datetime, time, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from perspective.page_cache import PageCache
+
+SITE_TITLE = "Daudi's Perspective"
+SITE_DESCRIPTION = 'Thoughts on building things that are made to last.'
+
+RSS = 'rss'
+ATOM = 'atom'
+JSON_FEED = 'json'
+
+MIMETYPES = {
+    RSS: 'application/rss+xml',
+    ATOM: 'application/atom+xml',
+    JSON_FEED: 'application/feed+json',
+}
+FILE_NAMES = {
+    RSS: 'feed.xml',
+    ATOM: 'atom.xml',
+    JSON_FEED: 'feed.json',
+}
+
+
+def published_at(article: Dict) -> datetime:
+    """Returns an article's publication date as a UTC datetime."""
+    return datetime.combine(article['published'], time.min, tzinfo=timezone.utc)
+
+
+def feed_articles(articles: List[Dict], limit: int, category: Optional[str] = None) -> List[Dict]:
+    """
+    Selects the newest dated articles for a feed.
+
+    Undated articles are left out: feed readers order and de-duplicate by
+    date, and an entry without one would jump around between polls.
+
+    Args:
+        articles (list): Unique articles, newest first.
+        limit (int): Maximum number of entries.
+        category (str): Only include this category (case-insensitive).
+    """
+    selected = []
+    for article in articles:
+        if article.get('published') is None:
+            continue
+        if category and article.get('category', '').lower() != category.lower():
+            continue
+        selected.append(article)
+        if len(selected) == limit:
+            break
+    return selected
+
+
+def feed_path(kind: str, category: Optional[str] = None) -> str:
+    """
+    Returns the canonical path of a feed, relative to the site root.
+
+    Category feeds are matched case-insensitively, so the path always uses
+    the lowercased category; the self link then doesn't depend on the
+    casing of whichever request first built the feed.
+    """
+    if not category:
+        return FILE_NAMES[kind]
+    return 'category/%s/%s' % (quote(category.lower(), safe=''), FILE_NAMES[kind])
+
+
+class FeedBuilder:
+    """Serializes feeds, reusing cached fragments for unchanged articles."""
+
+    def __init__(self, max_fragments: int = 1024):
+        self._fragments = PageCache(max_entries=max_fragments)
+
+    def build(self, kind: str, articles: List[Dict], base_url: str, feed_path: str,
+              title: str = SITE_TITLE) -> str:
+        """
+        Renders a complete feed.
+
+        Args:
+            kind (str): RSS, ATOM or JSON_FEED.
+            articles (list): The entries, newest first (see feed_articles).
+            base_url (str): Absolute site URL ending in '/'.
+            feed_path (str): Path of the feed itself, e.g. 'feed.xml'.
+            title (str): Feed title.
+        """
+        entries = [self._fragment(kind, article, base_url) for article in articles]
+        updated = published_at(articles[0]) if articles else datetime.now(timezone.utc)
+        feed_url = base_url + feed_path
+        if kind == RSS:
+            return (
+                '<?xml version="1.0" encoding="utf-8"?>\n'
+                '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" '
+                'xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>'
+                '<title>%s</title><link>%s</link><description>%s</description>'
+                '<atom:link href=%s rel="self" type="application/rss+xml"/>'
+                '<lastBuildDate>%s</lastBuildDate>%s</channel></rss>'
+            ) % (escape(title), escape(base_url), escape(SITE_DESCRIPTION), quoteattr(feed_url),
+                 format_datetime(updated), ''.join(entries))
+        if kind == ATOM:
+            return (
+                '<?xml version="1.0" encoding="utf-8"?>\n'
+                '<feed xmlns="http://www.w3.org/2005/Atom">'
+                '<title>%s</title><subtitle>%s</subtitle><id>%s</id>'
+                '<link href=%s/><link href=%s rel="self"/>'
+                '<updated>%s</updated><author><name>Daudi</name></author>%s</feed>'
+            ) % (escape(title), escape(SITE_DESCRIPTION), escape(feed_url), quoteattr(base_url),
+                 quoteattr(feed_url), updated.isoformat(), ''.join(entries))
+        header = json.dumps({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': title,
+            'description': SITE_DESCRIPTION,
+            'home_page_url': base_url,
+            'feed_url': feed_url,
+        })
+        # Splice the pre-serialized items into the header object.
+        return '%s, "items": [%s]}' % (header[:-1], ', '.join(entries))
+
+    def _fragment(self, kind: str, article: Dict, base_url: str) -> str:
+        key = (kind, base_url, article['id'])
+        fragment = self._fragments.get(key, article['revision'])
+        if fragment is None:
+            fragment = _SERIALIZERS[kind](article, base_url)
+            self._fragments.set(key, article['revision'], fragment)
+        return fragment
+
+
+def _article_url(article: Dict, base_url: str) -> str:
+    return '%sarticle/%s' % (base_url, quote(str(article['id']), safe=''))
+
+
+def _rss_item(article: Dict, base_url: str) -> str:
+    url = _article_url(article, base_url)
+    return (
+        '<item><title>%s</title><link>%s</link><guid isPermaLink="true">%s</guid>'
+        '<category>%s</category><pubDate>%s</pubDate><description>%s</description>'
+        '<content:encoded>%s</content:encoded></item>'
+    ) % (escape(article['title']), escape(url), escape(url), escape(article.get('category', '')),
+         format_datetime(published_at(article)), escape(article['excerpt']),
+         escape(str(article['body_html'])))
+
+
+def _atom_entry(article: Dict, base_url: str) -> str:
+    url = _article_url(article, base_url)
+    published = published_at(article).isoformat()
+    return (
+        '<entry><title>%s</title><link href=%s/><id>%s</id>'
+        '<published>%s</published><updated>%s</updated><category term=%s/>'
+        '<summary>%s</summary><content type="html">%s</content></entry>'
+    ) % (escape(article['title']), quoteattr(url), escape(url), published, published,
+         quoteattr(article.get('category', '')), escape(article['excerpt']),
+         escape(str(article['body_html'])))
+
+
+def _json_item(article: Dict, base_url: str) -> str:
+    url = _article_url(article, base_url)
+    return json.dumps({
+        'id': url,
+        'url': url,
+        'title': article['title'],
+        'summary': article['excerpt'],
+        'content_html': str(article['body_html']),
+        'date_published': published_at(article).isoformat(),
+        'tags': [article['category']] if article.get('category') else [],
+    })
+
+
+_SERIALIZERS = {RSS: _rss_item, ATOM: _atom_entry, JSON_FEED: _json_item}
@@ -0,0 +1,168 @@
+"""
+Structured (JSON lines) logging that never blocks the caller on disk I/O.
+
+Records are put on a bounded in-memory queue and a background thread
+writes them out in batches: one write() and one flush() per batch rather
+than per record. When the queue is full the logger either drops the
+record (the default, counting how many were lost and logging that count
+once there is room again) or blocks the caller, depending on `policy`.
+
+The writer checks the log file's inode before each batch and reopens it
+when logrotate has moved it away, so no signal handling is needed. A
+batch that cannot be written (disk full, missing permissions) is counted
+as dropped, and the file is opened afresh for the next one.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DROP = 'drop'
+BLOCK = 'block'
+
+_STOP = object()
+
+
+class JSONLinesLogger:
+    """Buffered JSON lines logger with a background writer thread."""
+
+    def __init__(self, path: str, max_queue: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 1.0, policy: str = DROP):
+        """
+        Args:
+            path (str): The log file; its directory is created if needed.
+            max_queue (int): Records held in memory before `policy` applies.
+            batch_size (int): Maximum records written per batch.
+            flush_interval (float): Longest time a record waits in the queue.
+            policy (str): 'drop' to discard records when the queue is full,
+                'block' to make the caller wait for space.
+        """
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.dropped = 0
+        self.last_error: Optional[OSError] = None
+        self._dropped_lock = threading.Lock()
+        self._pid = None
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        """
+        Queues one record. A 'ts' field is added if missing.
+
+        Returns:
+            bool: False if the record was dropped because the queue was full.
+        """
+        self._ensure_started()
+        record.setdefault('ts', time.time())
+        if self.policy == BLOCK:
+            self._queue.put(record)
+            return True
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._count_dropped(1)
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Writes out everything queued and stops the writer thread."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        self._thread = None
+
+    def _count_dropped(self, count: int) -> None:
+        with self._dropped_lock:
+            self.dropped += count
+
+    def _take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def _ensure_started(self) -> None:
+        # Start lazily, and again after a fork: threads don't survive fork(),
+        # so a Gunicorn worker must not inherit the master's queue.
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name='jsonlog-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        stream = None
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            dropped = self._take_dropped()
+            if dropped:
+                batch.append({'ts': time.time(), 'event': 'log_records_dropped', 'count': dropped})
+            if not batch:
+                continue
+            try:
+                stream = self._reopen_if_rotated(stream)
+                stream.write(''.join(json.dumps(r, default=str, separators=(',', ':')) + '\n' for r in batch))
+                stream.flush()
+            except OSError as e:
+                # Keep the thread alive: callers in 'block' mode would
+                # otherwise wait forever for queue space.
+                self.last_error = e
+                self._count_dropped(len(batch) - (1 if dropped else 0) + dropped)
+                stream = self._close_quietly(stream)
+        self._close_quietly(stream)
+
+    @staticmethod
+    def _close_quietly(stream) -> None:
+        if stream is not None:
+            try:
+                stream.close()
+            except OSError:
+                pass
+        return None
+
+    def _reopen_if_rotated(self, stream):
+        """Returns an open stream for self.path, reopening it after rotation."""
+        if stream is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(stream.fileno()).st_ino:
+                    return stream
+            except FileNotFoundError:
+                pass
+            self._close_quietly(stream)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(self.path, 'a', encoding='utf-8')
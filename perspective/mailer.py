@@ -0,0 +1,160 @@
+"""
+Outgoing mail over a reused SMTP connection.
+
+Opening an SMTP session (TCP connect, EHLO, STARTTLS, AUTH) costs several
+round trips, which is far more than sending one short message. The mailer
+keeps one session open between sends, checks it with NOOP when it has been
+idle, and reconnects when the server has dropped it. Messages are queued
+and sent in batches over that session.
+
+Transient failures (disconnects, timeouts, 4xx replies) are retried with
+exponential backoff; permanent 5xx replies fail the message at once.
+
+For local testing, point it at any plain SMTP stand-in with STARTTLS and
+login turned off, for example:
+
+    python -m aiosmtpd -n -l localhost:1025
+"""
+
+import smtplib
+import time
+from email.message import Message
+from typing import Callable, List, Optional, Tuple
+
+
+def _is_transport_error(error: Exception) -> bool:
+    """Whether a fresh connection may succeed after `error`."""
+    # SMTPException subclasses OSError, so it has to be told apart from
+    # socket errors explicitly.
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPMailer:
+    """Sends queued messages over one long-lived SMTP session."""
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True, timeout: float = 30.0,
+                 idle_check: float = 60.0, max_retries: int = 3, backoff: float = 1.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            host (str): SMTP server.
+            port (int): SMTP port.
+            username (str): Login name; no AUTH is attempted without one.
+            password (str): Login password.
+            starttls (bool): Upgrade the session with STARTTLS.
+            timeout (float): Socket timeout in seconds.
+            idle_check (float): Seconds of idleness after which the session
+                is checked with NOOP before reuse.
+            max_retries (int): Retries per message for transient failures.
+            backoff (float): Delay before the first retry; doubles each time.
+            sleep (callable): Used for backoff delays.
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.connections_opened = 0
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._queue: List[Message] = []
+
+    def queue(self, message: Message) -> None:
+        """Adds a message to the next batch."""
+        self._queue.append(message)
+
+    def flush(self) -> Tuple[int, List[Tuple[Message, Exception]]]:
+        """
+        Sends every queued message.
+
+        Returns:
+            tuple: The number of messages sent, and (message, error) pairs
+            for those that could not be delivered.
+        """
+        batch, self._queue = self._queue, []
+        sent = 0
+        failed = []
+        for message in batch:
+            try:
+                self.send(message)
+                sent += 1
+            except (smtplib.SMTPException, OSError) as e:
+                failed.append((message, e))
+        return sent, failed
+
+    def send(self, message: Message) -> None:
+        """
+        Sends one message now, retrying transient failures.
+
+        Raises:
+            smtplib.SMTPException: The server rejected the message, or the
+                retries were used up.
+        """
+        attempt = 0
+        while True:
+            try:
+                self._connection().send_message(message)
+                self._last_used = time.monotonic()
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                if _is_transport_error(e):
+                    self._discard()
+                elif not (isinstance(e, smtplib.SMTPResponseException) and e.smtp_code < 500):
+                    # 5xx replies, refused recipients and the like: another
+                    # attempt would get the same answer.
+                    raise
+                # Otherwise 4xx: the session is fine, the server wants us to wait.
+                if attempt >= self.max_retries:
+                    raise
+            self.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        """Ends the SMTP session, if one is open."""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_check:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._discard()
+            except (smtplib.SMTPException, OSError) as e:
+                if not _is_transport_error(e):
+                    raise
+                self._discard()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password or '')
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.connections_opened += 1
+            self._last_used = time.monotonic()
+        return self._smtp
+
+    def _discard(self) -> None:
+        """Drops a broken session without talking to the server."""
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except OSError:
+                pass
+            self._smtp = None
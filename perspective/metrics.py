@@ -0,0 +1,241 @@
+"""
+Low-overhead request metrics with a Prometheus text exposition.
+
+Each worker process records counters and fixed-bucket histograms in plain
+Python lists; recording a value is a bisect and two increments. To
+aggregate across Gunicorn workers, a daemon thread in every process
+periodically writes its state to its own file in a shared directory
+(`METRICS_DIR`), so no request ever waits for that write. The /metrics
+endpoint merges all files, so any worker can answer for the whole server.
+
+When a worker exits, Gunicorn's child_exit hook folds its file into an
+archive file, so counts from recycled workers are kept without the
+directory growing by one file per recycled worker.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from perspective.paths import private_directory
+
+# Upper bounds (in seconds) for latency histograms: 100 µs to 2.5 s.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Upper bounds (in bytes) for response size histograms: 512 B to 1 MB.
+SIZE_BUCKETS = (512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072,
+                262144, 524288, 1048576)
+
+ARCHIVE_FILE = 'metrics-archive.json'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Collects counters and histograms for one process."""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        """
+        Args:
+            directory (str): Shared directory for cross-worker aggregation.
+                Without one, only this process's metrics are exposed.
+            flush_interval (float): Seconds between two writes of this
+                process's state to the directory.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {}
+        self._pid = os.getpid()
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+        if directory:
+            private_directory(directory)
+
+    def counter(self, name: str, documentation: str) -> None:
+        """Declares a counter."""
+        self._counters.setdefault(name, {})
+        self._help[name] = documentation
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float]) -> None:
+        """Declares a histogram with the given bucket upper bounds."""
+        self._histograms.setdefault(name, {})
+        self._buckets[name] = tuple(buckets)
+        self._help[name] = documentation
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """Increments a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Records one value in a histogram."""
+        key = tuple(sorted(labels.items()))
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._histograms[name]
+            state = series.get(key)
+            if state is None:
+                # One slot per bucket plus +Inf, then sum and count.
+                state = series[key] = [0.0] * (len(buckets) + 3)
+            state[bisect_left(buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def start_flusher(self) -> None:
+        """Starts the thread that writes this process's state every `flush_interval`."""
+        # Cheap enough to call on every request: threads don't survive
+        # fork(), so each worker starts its own the first time round.
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            threading.Thread(target=self._run_flusher, name='metrics-flusher', daemon=True).start()
+            self._flusher_pid = os.getpid()
+
+    def _run_flusher(self) -> None:
+        pid = os.getpid()
+        while True:
+            time.sleep(self.flush_interval)
+            if os.getpid() != pid:
+                return
+            try:
+                self.flush()
+            except OSError:
+                # Keep the thread alive; the next write may succeed.
+                pass
+
+    def flush(self) -> None:
+        """Writes this process's state to the shared directory."""
+        if not self.directory:
+            return
+        # Workers are forked from the master; record under our own PID.
+        self._pid = os.getpid()
+        path = os.path.join(self.directory, 'metrics-%d.json' % self._pid)
+        _write_json(path, self._state())
+
+    def _state(self) -> dict:
+        with self._lock:
+            return {
+                'counters': {n: [[list(k), v] for k, v in s.items()] for n, s in self._counters.items()},
+                'histograms': {n: [[list(k), list(v)] for k, v in s.items()] for n, s in self._histograms.items()},
+            }
+
+    def collect(self) -> dict:
+        """Returns the merged state of every worker (or just this one)."""
+        if not self.directory:
+            return self._state()
+        self.flush()
+        merged = {'counters': {}, 'histograms': {}}
+        for name in os.listdir(self.directory):
+            if name.startswith('metrics-') and name.endswith('.json'):
+                state = _read_json(os.path.join(self.directory, name))
+                if state:
+                    _merge_state(merged, state)
+        return merged
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        state = self.collect()
+        lines = []
+        for name in sorted(self._counters):
+            lines.append('# HELP %s %s' % (name, self._help[name]))
+            lines.append('# TYPE %s counter' % name)
+            for labels, value in state['counters'].get(name, []):
+                lines.append('%s%s %s' % (name, _format_labels(labels), _format_value(value)))
+        for name in sorted(self._histograms):
+            buckets = self._buckets[name]
+            lines.append('# HELP %s %s' % (name, self._help[name]))
+            lines.append('# TYPE %s histogram' % name)
+            for labels, values in state['histograms'].get(name, []):
+                cumulative = 0.0
+                for bound, count in zip(list(buckets) + ['+Inf'], values):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(bound)
+                    lines.append('%s_bucket%s %s' % (name, _format_labels(labels + [['le', le]]), _format_value(cumulative)))
+                lines.append('%s_sum%s %s' % (name, _format_labels(labels), repr(values[-2])))
+                lines.append('%s_count%s %s' % (name, _format_labels(labels), _format_value(values[-1])))
+        return '\n'.join(lines) + '\n'
+
+
+def archive_worker(directory: str, pid: int) -> None:
+    """
+    Folds a dead worker's metrics into the archive file.
+
+    Called from Gunicorn's child_exit hook in the master process.
+    """
+    path = os.path.join(directory, 'metrics-%d.json' % pid)
+    state = _read_json(path)
+    if state is None:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = _read_json(archive_path) or {'counters': {}, 'histograms': {}}
+    _merge_state(archive, state)
+    _write_json(archive_path, archive)
+    os.unlink(path)
+
+
+def reset_directory(directory: str, owner: Optional[int] = None, group: Optional[int] = None) -> None:
+    """
+    Removes all metrics files, e.g. when the server starts.
+
+    Creates the directory if needed; `owner` and `group` are as for
+    private_directory().
+    """
+    private_directory(directory, owner, group)
+    for name in os.listdir(directory):
+        if name.startswith('metrics-') and name.endswith('.json'):
+            os.unlink(os.path.join(directory, name))
+
+
+def _merge_state(into: dict, state: dict) -> None:
+    for name, series in state.get('counters', {}).items():
+        target = dict((tuple(map(tuple, k)), v) for k, v in into['counters'].get(name, []))
+        for labels, value in series:
+            key = tuple(map(tuple, labels))
+            target[key] = target.get(key, 0.0) + value
+        into['counters'][name] = [[list(map(list, k)), v] for k, v in target.items()]
+    for name, series in state.get('histograms', {}).items():
+        target = dict((tuple(map(tuple, k)), v) for k, v in into['histograms'].get(name, []))
+        for labels, values in series:
+            key = tuple(map(tuple, labels))
+            current = target.get(key)
+            target[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+        into['histograms'][name] = [[list(map(list, k)), v] for k, v in target.items()]
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = ('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+    return '{%s}' % ','.join(escaped)
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
@@ -0,0 +1,76 @@
+"""
+Per-process cache for fully rendered pages.
+
+Entries are tagged with the store's data version. A lookup with a newer
+version treats the old entry as a miss, so a data reload invalidates every
+cached page without an explicit purge.
+
+A PageCache can sit in front of a SharedPageCache (see shared_cache): misses
+fall through to the shared tier and writes go to both, so a page rendered
+by one worker is served by all of them, and by their replacements.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from perspective.shared_cache import SharedPageCache
+
+
+class PageCache:
+    """A small thread-safe LRU cache of version-tagged values."""
+
+    def __init__(self, max_entries: int = 256, shared: Optional[SharedPageCache] = None):
+        """
+        Args:
+            max_entries (int): Entries kept in this process.
+            shared (SharedPageCache): Optional second tier shared by all
+                worker processes.
+        """
+        self.max_entries = max_entries
+        self.shared = shared
+        self.shared_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        """
+        Returns the cached value for `key` if it was stored at `version`.
+
+        Args:
+            key: Identifies the page, e.g. ('index', 2).
+            version (str): The current data version.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        if self.shared is None:
+            return None
+        value = self.shared.get(key, version)
+        if value is not None:
+            self.shared_hits += 1
+            self._set_local(key, version, value)
+        return value
+
+    def set(self, key: Hashable, version: str, value: Any) -> None:
+        """Stores `value` for `key` at `version` in both tiers."""
+        self._set_local(key, version, value)
+        if self.shared is not None:
+            self.shared.set(key, version, value)
+
+    def _set_local(self, key: Hashable, version: str, value: Any) -> None:
+        """Stores an entry in this process, evicting the oldest entry if full."""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
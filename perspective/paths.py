@@ -0,0 +1,51 @@
+"""
+Private working directories.
+
+The page cache, metrics and template bytecode live in directories under
+/tmp or /dev/shm by default. Those paths are predictable, so another
+local user could create one first and feed the server files of their
+choosing. Each such directory is therefore created with mode 0700, and an
+existing one is only used if it is owned by the expected user.
+"""
+
+import os
+import stat
+from typing import Optional
+
+
+def private_directory(path: str, owner: Optional[int] = None, group: Optional[int] = None) -> str:
+    """
+    Creates `path` with mode 0700, or checks that an existing one is safe.
+
+    Args:
+        path (str): The directory.
+        owner (int): User that must own it; defaults to the current one.
+            When running as root, a directory root created is handed over
+            to `owner` (e.g. the Gunicorn master preparing one for workers).
+        group (int): Group to give it when handing it over.
+
+    Returns:
+        str: `path`.
+
+    Raises:
+        PermissionError: The path is not a directory, or someone else owns it.
+    """
+    uid = os.getuid()
+    owner = uid if owner is None else owner
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    try:
+        os.mkdir(path, stat.S_IRWXU)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if st.st_uid != owner:
+        if st.st_uid != uid or uid != 0:
+            raise PermissionError(f"{path} is owned by uid {st.st_uid}, expected {owner}")
+        os.chown(path, owner, -1 if group is None else group)
+    if stat.S_IMODE(st.st_mode) != stat.S_IRWXU:
+        os.chmod(path, stat.S_IRWXU)
+    return path
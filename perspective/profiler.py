@@ -0,0 +1,179 @@
+"""
+Opt-in sampling profiler for a running worker.
+
+While active, a background thread wakes up every `interval` seconds, takes
+the stacks of the other threads with sys._current_frames() and counts
+those that pass through Flask's request dispatch. When the window ends
+(or the profiler is stopped) the counts are written as collapsed stacks,
+one "frame;frame;frame count" line per unique stack, which flamegraph.pl,
+speedscope and inferno read directly.
+
+Nothing runs until the profiler is started, either by sending SIGUSR2 to
+a worker process (not the Gunicorn master, where USR2 means "upgrade") or
+through the authenticated /admin/profile route. The cost while running is
+one stack walk per thread per interval, and both the window length and
+the number of distinct stacks kept are capped.
+"""
+
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from perspective.paths import private_directory
+
+# The frame that marks a stack as part of request handling.
+REQUEST_FRAME = ('flask/app.py', 'full_dispatch_request')
+_SITE_PACKAGES = 'site-packages' + os.sep
+_CWD = os.getcwd() + os.sep
+
+
+class SamplingProfiler:
+    """Samples the stacks of request-handling threads for a bounded window."""
+
+    def __init__(self, output_dir: str, interval: float = 0.01,
+                 max_duration: float = 60.0, max_stacks: int = 20000):
+        """
+        Args:
+            output_dir (str): Where collapsed-stack files are written.
+            interval (float): Seconds between two samples.
+            max_duration (float): Upper bound on a profiling window.
+            max_stacks (int): Distinct stacks kept; further new stacks
+                are counted under a single '[truncated]' entry.
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_stacks = max_stacks
+        self.last_output: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._windows = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """
+        Starts a profiling window.
+
+        Args:
+            duration (float): Window length in seconds, capped at
+                `max_duration`. Defaults to the cap.
+
+        Returns:
+            bool: False if a window is already running.
+
+        Raises:
+            ValueError: `duration` is not a positive number.
+        """
+        if duration is None:
+            duration = self.max_duration
+        elif not duration > 0:
+            raise ValueError(f"Profiling duration must be positive, got {duration}")
+        with self._lock:
+            if self.running:
+                return False
+            duration = min(duration, self.max_duration)
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(duration,), name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        """Ends the current window early; the sampler thread writes the output."""
+        self._stop.set()
+
+    def toggle(self) -> None:
+        """Starts a window if none is running, otherwise stops it."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def install_signal_handler(self, signum: int = signal.SIGUSR2) -> None:
+        """
+        Makes `signum` toggle the profiler in this process.
+
+        The handler runs on the main thread between two bytecodes, possibly
+        while that thread holds `_lock` in start(), so it only sets an event;
+        a helper thread does the toggling.
+        """
+        requested = threading.Event()
+
+        def toggle_on_request():
+            while True:
+                requested.wait()
+                requested.clear()
+                self.toggle()
+
+        threading.Thread(target=toggle_on_request, name='profiler-signal', daemon=True).start()
+        signal.signal(signum, lambda *args: requested.set())
+
+    def _run(self, duration: float) -> None:
+        own_id = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + duration
+        started = time.time()
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _collapse(frame)
+                if stack is None:
+                    continue
+                if stack not in stacks and len(stacks) >= self.max_stacks:
+                    stack = '[truncated]'
+                stacks[stack] += 1
+            self._stop.wait(self.interval)
+        self.last_output = self._write(stacks, started)
+
+    def _write(self, stacks: Counter, started: float) -> str:
+        # Stacks reveal code paths and arguments, so the directory is
+        # private; O_EXCL refuses to follow a file or symlink planted there.
+        private_directory(self.output_dir)
+        name = 'profile-%d-%s-%d.collapsed' % (
+            os.getpid(), time.strftime('%Y%m%d-%H%M%S', time.localtime(started)), next(self._windows))
+        path = os.path.join(self.output_dir, name)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(fd, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write('%s %d\n' % (stack, count))
+        return path
+
+
+def _collapse(frame) -> Optional[str]:
+    """
+    Turns a frame chain into a 'root;...;leaf' string.
+
+    Returns None for stacks that are not handling a request, such as a
+    sync worker waiting for its next connection.
+    """
+    frames = []
+    in_request = False
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if code.co_name == REQUEST_FRAME[1] and filename.endswith(REQUEST_FRAME[0]):
+            in_request = True
+        frames.append('%s (%s)' % (code.co_name, _short_path(filename)))
+        frame = frame.f_back
+    if not in_request:
+        return None
+    frames.reverse()
+    return ';'.join(frames)
+
+
+def _short_path(filename: str) -> str:
+    """Trims site-packages and working directory prefixes from a path."""
+    index = filename.rfind(_SITE_PACKAGES)
+    if index != -1:
+        return filename[index + len(_SITE_PACKAGES):]
+    return filename[len(_CWD):] if filename.startswith(_CWD) else os.path.basename(filename)
@@ -0,0 +1,193 @@
+"""
+Related-articles engine.
+
+Articles are turned into TF-IDF vectors (title, body text and category)
+and compared with cosine similarity. Only the top-k neighbours of each
+article are kept, so rendering a page reads a short precomputed list.
+
+The similarity matrix is never materialized in full: rows are processed
+in blocks of `block_size`, each block is multiplied against the whole
+(L2-normalized) document matrix and reduced to its top-k with
+argpartition. Memory stays at O(n * max_features + block_size * n), which
+keeps rebuilds practical for tens of thousands of articles.
+
+The neighbours are built offline, by the rebuild watcher or by hand:
+
+    python -m perspective.related data/articles.json data/related.json
+
+The store only loads that file, once its data version matches the data;
+until then it keeps the previous neighbours.
+"""
+
+import json
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, List, Optional
+
+from perspective.content import classify_blocks
+
+DEFAULT_TOP_K = 3
+DEFAULT_MAX_FEATURES = 2048
+DEFAULT_BLOCK_SIZE = 1024
+# Category and title terms say more about a topic than a passing mention
+# in the body, so they are counted several times.
+CATEGORY_WEIGHT = 5
+TITLE_WEIGHT = 3
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'-]{2,}")
+STOP_WORDS = frozenset("""
+    about above after again against all and any are aren't because been before being
+    below between both but can't cannot could couldn't did didn't does doesn't doing
+    don't down during each few for from further had hadn't has hasn't have haven't
+    having he'd he'll he's her here here's hers herself him himself his how how's i'd
+    i'll i'm i've into isn't it's its itself just let's more most mustn't myself nor
+    not off once only other ought our ours ourselves out over own same shan't she
+    she'd she'll she's should shouldn't some such than that that's the their theirs
+    them themselves then there there's these they they'd they'll they're they've this
+    those through too under until very was wasn't we'd we'll we're we've were weren't
+    what what's when when's where where's which while who who's whom why why's will
+    with won't would wouldn't you you'd you'll you're you've your yours yourself
+    yourselves also one two like even much many every still
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases and splits text into terms, dropping stop words."""
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOP_WORDS]
+
+
+def article_terms(article: Dict) -> List[str]:
+    """Returns the weighted term list that represents an article."""
+    # The text of the compiled blocks, so markup (tag names, link URLs,
+    # dropped <script> bodies) never becomes a term.
+    blocks = article.get('blocks') or classify_blocks(article.get('content') or [])
+    body = ' '.join(block.text for block in blocks)
+    terms = tokenize(body)
+    terms.extend(tokenize(article.get('title', '')) * TITLE_WEIGHT)
+    category = article.get('category')
+    if category:
+        terms.extend(['__category_%s' % category.lower()] * CATEGORY_WEIGHT)
+    return terms
+
+
+def build_related(articles: List[Dict], top_k: int = DEFAULT_TOP_K,
+                  max_features: int = DEFAULT_MAX_FEATURES,
+                  block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, List[str]]:
+    """
+    Computes the top-k most similar articles for every article.
+
+    Args:
+        articles (list): Article dictionaries with unique 'id' values.
+        top_k (int): Neighbours to keep per article.
+        max_features (int): Vocabulary size cap; the terms shared by the
+            most documents are kept.
+        block_size (int): Rows of the similarity matrix computed at once.
+
+    Returns:
+        dict: Article ID -> list of related article IDs, best match first.
+    """
+    import numpy as np
+
+    n = len(articles)
+    if n < 2:
+        return {a['id']: [] for a in articles}
+
+    docs = [Counter(article_terms(a)) for a in articles]
+    df = Counter()
+    for doc in docs:
+        df.update(doc.keys())
+    # Terms that occur in a single document cannot connect two articles.
+    shared = [(count, term) for term, count in df.items() if count > 1]
+    shared.sort(reverse=True)
+    vocabulary = {term: i for i, (_, term) in enumerate(shared[:max_features])}
+    if not vocabulary:
+        return {a['id']: [] for a in articles}
+
+    rows, cols, counts = [], [], []
+    for row, doc in enumerate(docs):
+        for term, count in doc.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                counts.append(count)
+
+    matrix = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    # Sublinear term frequency damps very repetitive articles.
+    matrix[np.array(rows), np.array(cols)] = 1.0 + np.log(np.array(counts, dtype=np.float32))
+    doc_freq = np.array([df[term] for term in vocabulary], dtype=np.float32)
+    matrix *= np.log((1.0 + n) / (1.0 + doc_freq)) + 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    k = min(top_k, n - 1)
+    ids = [a['id'] for a in articles]
+    related = {}
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        scores = matrix[start:end] @ matrix.T
+        scores[np.arange(end - start), np.arange(start, end)] = -1.0  # never related to itself
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        for offset in range(end - start):
+            related[ids[start + offset]] = [
+                ids[j] for j, score in zip(candidates[offset], candidate_scores[offset]) if score > 0
+            ]
+    return related
+
+
+def load_related(path: str, version: str) -> Optional[Dict[str, List[str]]]:
+    """
+    Reads precomputed neighbours, if they were built for `version`.
+
+    Returns:
+        dict: The neighbour lists, or None if the file is missing or stale.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get('version') != version:
+        return None
+    return data.get('related')
+
+
+def save_related(path: str, version: str, related: Dict[str, List[str]]) -> None:
+    """Writes neighbour lists atomically, tagged with the data version."""
+    # Per-process temp name: a manual run may overlap the watcher's.
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'related': related}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def main():
+    """Builds data/related.json from the articles file (offline build step)."""
+    from perspective.store import ArticleStore
+
+    articles_file = sys.argv[1] if len(sys.argv) > 1 else 'data/articles.json'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        os.path.dirname(articles_file), 'related.json')
+    # related_top_k=0: the store must not build the neighbours itself.
+    store = ArticleStore(articles_file, related_top_k=0)
+    related = build_related(list(store.snapshot.by_id.values()))
+    save_related(output_file, store.snapshot.version, related)
+    print(f"Wrote related articles for {len(related)} articles to {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+A small timer loop for recurring jobs in a long-running process.
+
+Jobs are kept in a heap ordered by their next due time (on the monotonic
+clock), so the loop sleeps exactly until the earliest job is due instead
+of polling. A job that raises is logged and rescheduled; one failing job
+never stops the others. The loop sleeps on an Event, so `stop()` (e.g.
+from a SIGTERM handler) ends it immediately.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from typing import Callable, List, NamedTuple, Optional
+
+
+class Job(NamedTuple):
+    name: str
+    interval: float
+    func: Callable[[], None]
+
+
+class JobScheduler:
+    """Runs jobs at fixed intervals until stopped."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 on_error: Optional[Callable[[Job, BaseException], None]] = None):
+        """
+        Args:
+            clock (callable): Monotonic time source, in seconds.
+            on_error (callable): Called with the job and the exception when
+                a job raises. Defaults to printing the traceback.
+        """
+        self.clock = clock
+        self.on_error = on_error or _print_error
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+
+    def every(self, name: str, interval: float, func: Callable[[], None],
+              initial_delay: float = 0.0) -> Job:
+        """
+        Schedules `func` to run every `interval` seconds.
+
+        Args:
+            name (str): Used in error reports.
+            interval (float): Seconds between the starts of two runs.
+            func (callable): The job; takes no arguments.
+            initial_delay (float): Seconds before the first run.
+        """
+        if interval <= 0:
+            raise ValueError(f"Job {name!r} needs a positive interval")
+        job = Job(name, interval, func)
+        self._push(self.clock() + initial_delay, job)
+        return job
+
+    def run_pending(self) -> Optional[float]:
+        """
+        Runs every job that is due.
+
+        Returns:
+            float: Seconds until the next job is due, or None if there are
+            no jobs.
+        """
+        while self._heap and not self._stop.is_set():
+            due, _, job = self._heap[0]
+            now = self.clock()
+            if due > now:
+                return due - now
+            heapq.heappop(self._heap)
+            try:
+                job.func()
+            except Exception as e:
+                self.on_error(job, e)
+            # Keep the original cadence, but skip runs missed while a slow
+            # job (or a suspended machine) held things up.
+            next_due = due + job.interval
+            if next_due <= self.clock():
+                next_due = self.clock() + job.interval
+            self._push(next_due, job)
+        return None
+
+    def run_forever(self) -> None:
+        """Runs jobs as they become due until `stop()` is called."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            delay = self.run_pending()
+            self._stop.wait(delay if delay is not None else 60.0)
+
+    def stop(self) -> None:
+        """Makes run_forever() return; safe to call from a signal handler."""
+        self._stop.set()
+
+    def _push(self, due: float, job: Job) -> None:
+        # The counter breaks ties so jobs themselves are never compared.
+        heapq.heappush(self._heap, (due, next(self._counter), job))
+
+
+def _print_error(job: Job, error: BaseException) -> None:
+    print(f"Job {job.name!r} failed: {error}")
+    traceback.print_exception(type(error), error, error.__traceback__)
@@ -0,0 +1,176 @@
+"""
+Cross-process page cache in a shared directory.
+
+Gunicorn workers are separate processes, so an in-process cache holds one
+copy of each page per worker, and a recycled worker starts empty. This
+tier keeps one file per entry in a directory that every worker can see.
+Put the directory on tmpfs (/dev/shm), so reads are copies out of shared
+memory and never touch a disk.
+
+- Reads take no locks. Writers build each file under a temporary name
+  and rename it into place, so a reader sees either the old file or the
+  new one, never a partial write.
+- Every entry carries the data version it was built from. A lookup at
+  another version is a miss, like in PageCache.
+- The directory must be private to the workers' user (mode 0700, owned
+  by them); anyone who can write to it can choose what pages are served.
+- Eviction is by total size. When the directory grows past `max_bytes`,
+  the oldest-written files are removed until it is back under a low-water
+  mark. Entries from superseded data versions are the oldest, so they go
+  first.
+
+Values are serialized with marshal, which is fast and only handles plain
+built-in types (str, bytes, tuples, dicts, ...). Anything else, such as a
+Markup string, stays in the per-process tier only.
+"""
+
+import hashlib
+import itertools
+import marshal
+import os
+import time
+from typing import Any, Hashable, Optional
+
+from perspective.paths import private_directory
+
+_MAGIC = b'DPC1'
+# The marshal format can change between Python versions; entries written by
+# another interpreter version are treated as misses.
+_FORMAT = _MAGIC + marshal.version.to_bytes(1, 'big')
+_TMP_PREFIX = '.tmp-'
+
+
+class SharedPageCache:
+    """Version-tagged cache entries stored as files in a shared directory."""
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024,
+                 low_water: float = 0.8):
+        """
+        Args:
+            directory (str): Cache directory, ideally on tmpfs.
+            max_bytes (int): Total size of all entries before eviction.
+            low_water (float): Eviction stops at this fraction of max_bytes.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._tmp_names = itertools.count()
+        # Bytes this process wrote since it last measured the directory;
+        # starting at the budget makes the first write measure it.
+        self._written = max_bytes
+        private_directory(directory)
+
+    def _path(self, key: Hashable) -> str:
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        """Returns the value stored for `key` at `version`, or None."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        header_size = len(_FORMAT) + 1
+        if data[:len(_FORMAT)] != _FORMAT:
+            return None
+        version_size = data[len(_FORMAT)]
+        if data[header_size:header_size + version_size] != version.encode('ascii'):
+            return None
+        try:
+            return marshal.loads(data[header_size + version_size:])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def set(self, key: Hashable, version: str, value: Any) -> bool:
+        """
+        Stores `value` for `key` at `version`.
+
+        Returns:
+            bool: False if the value cannot be shared (not marshallable) or
+            the directory is not writable.
+        """
+        try:
+            payload = marshal.dumps(value)
+        except ValueError:
+            return False
+        encoded_version = version.encode('ascii')
+        data = b''.join((_FORMAT, bytes([len(encoded_version)]), encoded_version, payload))
+        tmp_path = os.path.join(self.directory, '%s%d-%d' % (_TMP_PREFIX, os.getpid(), next(self._tmp_names)))
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+        self._written += len(data)
+        # Measuring the directory costs a scan, so only do it once this
+        # process alone could have filled a tenth of the budget.
+        if self._written >= self.max_bytes // 10:
+            self._written = 0
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        """
+        Removes the oldest entries while the directory is over budget.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith(_TMP_PREFIX):
+                # Left behind by a worker killed mid-write.
+                if now - st.st_mtime > 60:
+                    _unlink(entry.path)
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        target = self.max_bytes * self.low_water
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            _unlink(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        clear_directory(self.directory)
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if not name.startswith(_TMP_PREFIX))
+
+
+def clear_directory(directory: str, owner: Optional[int] = None, group: Optional[int] = None) -> None:
+    """
+    Empties a cache directory, e.g. when the server (and its code) restarts.
+
+    Creates it if needed; `owner` and `group` are as for private_directory().
+    """
+    private_directory(directory, owner, group)
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            _unlink(entry.path)
+
+
+def _unlink(path: str) -> None:
+    # Another worker may be evicting the same file.
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,117 @@
+"""
+Sitemap generation.
+
+Lists the home page and every article with its publication date as
+lastmod, so crawlers no longer have to walk the paginated index. Up to
+`shard_size` URLs (50,000, the protocol limit) fit in a plain sitemap.xml.
+Larger archives are split into gzip-compressed shards named
+sitemap-<n>.xml.gz, and sitemap.xml becomes a sitemap index pointing at
+them.
+
+The files depend only on the article data, so the app builds them once per
+data version, and `flask export-sitemap` writes them to a directory for
+static hosting, skipping the work when the data version is unchanged.
+"""
+
+import gzip
+import os
+from typing import Dict, List, Optional, Union
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+MAX_URLS_PER_SITEMAP = 50000
+INDEX_FILE = 'sitemap.xml'
+VERSION_STAMP = '.sitemap-version'
+
+
+def shard_name(number: int) -> str:
+    return 'sitemap-%d.xml.gz' % number
+
+
+def _url_entry(loc: str, lastmod: Optional[str]) -> str:
+    if lastmod:
+        return '<url><loc>%s</loc><lastmod>%s</lastmod></url>' % (escape(loc), lastmod)
+    return '<url><loc>%s</loc></url>' % escape(loc)
+
+
+def _urlset(entries: List[str]) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">%s</urlset>'
+    ) % ''.join(entries)
+
+
+def build_sitemaps(articles: List[Dict], base_url: str,
+                   shard_size: int = MAX_URLS_PER_SITEMAP) -> Dict[str, Union[str, bytes]]:
+    """
+    Builds all sitemap files.
+
+    Args:
+        articles (list): Unique articles, newest first.
+        base_url (str): Absolute site URL ending in '/'.
+        shard_size (int): Maximum URLs per sitemap file.
+
+    Returns:
+        dict: File name -> content. 'sitemap.xml' is text; shards are
+        gzip-compressed bytes.
+    """
+    newest = next((a['published'] for a in articles if a.get('published')), None)
+    entries = [_url_entry(base_url, newest.isoformat() if newest else None)]
+    for article in articles:
+        published = article.get('published')
+        entries.append(_url_entry(
+            '%sarticle/%s' % (base_url, quote(str(article['id']), safe='')),
+            published.isoformat() if published else None,
+        ))
+
+    if len(entries) <= shard_size:
+        return {INDEX_FILE: _urlset(entries)}
+
+    files = {}
+    index_entries = []
+    for number, start in enumerate(range(0, len(entries), shard_size), 1):
+        name = shard_name(number)
+        # mtime=0 keeps shard bytes (and so their ETags) stable across rebuilds.
+        files[name] = gzip.compress(_urlset(entries[start:start + shard_size]).encode('utf-8'), mtime=0)
+        index_entries.append('<sitemap><loc>%s</loc></sitemap>' % escape(base_url + name))
+    files[INDEX_FILE] = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">%s</sitemapindex>'
+    ) % ''.join(index_entries)
+    return files
+
+
+def export_sitemaps(articles: List[Dict], base_url: str, output_dir: str, version: str,
+                    shard_size: int = MAX_URLS_PER_SITEMAP) -> bool:
+    """
+    Writes the sitemap files to a directory, unless they are up to date.
+
+    A stamp file records the data version of the last export; stale shards
+    from a larger previous export are removed.
+
+    Returns:
+        bool: True if files were written, False if nothing had changed.
+    """
+    stamp_path = os.path.join(output_dir, VERSION_STAMP)
+    stamp = '%s %s %d' % (version, base_url, shard_size)
+    try:
+        with open(stamp_path, 'r', encoding='utf-8') as f:
+            if f.read().strip() == stamp:
+                return False
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = build_sitemaps(articles, base_url, shard_size)
+    for name in os.listdir(output_dir):
+        if name.startswith('sitemap-') and name.endswith('.xml.gz') and name not in files:
+            os.unlink(os.path.join(output_dir, name))
+    for name, content in files.items():
+        path = os.path.join(output_dir, name)
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+    with open(stamp_path, 'w', encoding='utf-8') as f:
+        f.write(stamp)
+    return True
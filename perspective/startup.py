@@ -0,0 +1,113 @@
+"""
+Startup time report and budget check.
+
+Measures what a cold worker pays before it can serve: importing the
+application module and answering its first request (template compilation,
+first page render), plus a second request for comparison. Each run uses a
+fresh interpreter with `-X importtime`, and the import log is folded into
+a per-package breakdown (self time, so nothing is counted twice).
+
+    python -m perspective.startup                   # report only
+    python -m perspective.startup --budget-ms 800   # exit 1 when over budget
+
+The budget can also come from STARTUP_BUDGET_MS, so CI or the deploy
+script can enforce it without extra arguments. It applies to the median
+of `--runs` runs of import time plus first-request time.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Runs in the child interpreter; prints one JSON line of timings.
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+client = module.app.test_client()
+status = client.get(sys.argv[2]).status_code
+first = time.perf_counter()
+client.get(sys.argv[2])
+second = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (first - imported) * 1000,
+    "second_request_ms": (second - first) * 1000,
+    "status": status,
+}))
+'''
+
+
+def measure(module: str = 'app', path: str = '/') -> Tuple[Dict[str, float], List[Tuple[str, int, int]]]:
+    """
+    Starts a fresh interpreter, imports `module` and requests `path` twice.
+
+    Returns:
+        tuple: The timings, and (module, self µs, cumulative µs) for every
+        module imported, parsed from the -X importtime log.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE, module, path],
+        capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return json.loads(result.stdout.strip().splitlines()[-1]), imports
+
+
+def package_breakdown(imports: List[Tuple[str, int, int]]) -> List[Tuple[str, float]]:
+    """Sums import self time per top-level package, largest first (in ms)."""
+    totals = defaultdict(int)
+    for name, self_us, _ in imports:
+        totals[name.split('.')[0]] += self_us
+    return sorted(((name, us / 1000) for name, us in totals.items()), key=lambda item: -item[1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--module', default='app', help='Module exposing the Flask `app` (default: app)')
+    parser.add_argument('--path', default='/', help='Path of the first request (default: /)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs to take the median of (default: 3)')
+    parser.add_argument('--top', type=int, default=12, help='Packages to list in the breakdown')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 0)),
+                        help='Fail when import + first request exceeds this (default: $STARTUP_BUDGET_MS)')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module, args.path) for _ in range(max(args.runs, 1))]
+    timings = {key: statistics.median(run[0][key] for run in runs)
+               for key in ('import_ms', 'first_request_ms', 'second_request_ms')}
+    status = runs[0][0]['status']
+    # The breakdown comes from the run whose total import time is the median.
+    imports = sorted(runs, key=lambda run: run[0]['import_ms'])[len(runs) // 2][1]
+
+    print(f"Import time by package ({args.module}, self time):")
+    for name, ms in package_breakdown(imports)[:args.top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+    print(f"\nImport {args.module}:        {timings['import_ms']:8.1f} ms")
+    print(f"First request {args.path}:   {timings['first_request_ms']:8.1f} ms (HTTP {status})")
+    print(f"Second request {args.path}:  {timings['second_request_ms']:8.1f} ms")
+    total = timings['import_ms'] + timings['first_request_ms']
+    print(f"Startup total:     {total:8.1f} ms (median of {len(runs)} runs)")
+
+    if args.budget_ms:
+        if total > args.budget_ms:
+            print(f"Over the startup budget of {args.budget_ms:.0f} ms by {total - args.budget_ms:.1f} ms")
+            return 1
+        print(f"Within the startup budget of {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
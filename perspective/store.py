@@ -0,0 +1,264 @@
+"""
+In-memory article store.
+
+The store reads 'articles.json' once, sorts it newest first, compiles each
+article body to sanitized HTML and keeps the result until the file on
+disk changes. A reload compiles only the articles whose source changed.
+Every load produces an immutable snapshot tagged with a data version (a
+hash of the file contents), so caches elsewhere in the app can key their
+entries on that version and never serve pages built from stale data.
+
+Related articles are only ever loaded from the precomputed file, which the
+rebuild watcher (or `python -m perspective.related`) writes; building them
+takes far longer than a request may, and once per worker would repeat the
+same work. When the file doesn't match the data, the snapshot keeps the
+previous snapshot's neighbours under a provisional version, and the store
+swaps in the completed snapshot, under the real version, as soon as the
+file catches up.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from perspective.content import COMPILED_FIELDS, compile_article
+from perspective.related import DEFAULT_TOP_K, load_related
+
+logger = logging.getLogger(__name__)
+
+# Appended to the data version of a snapshot whose related articles are
+# still being rebuilt, so pages cached from it are replaced afterwards.
+PROVISIONAL_SUFFIX = '-provisional'
+
+# Date formats found in articles.json. Older entries use the long form
+# ("August 23, 2025") written by the article updater; newer ones use ISO.
+DATE_FORMATS = ('%Y-%m-%d', '%B %d, %Y')
+
+
+def parse_article_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parses an article date in any of the formats used by the data file.
+
+    Args:
+        value (str): The raw 'date' field of an article, possibly missing.
+
+    Returns:
+        date: The parsed date, or None if it is missing or unparseable.
+    """
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class StoreSnapshot(NamedTuple):
+    """An immutable view of the article data at one data version."""
+    version: str
+    articles: List[Dict[str, Any]]
+    by_id: Dict[str, Dict[str, Any]]
+    loaded_at: float
+    # When the data file was last written (None without a file); unlike the
+    # article dates, this changes when an older article is edited.
+    modified_at: Optional[float] = None
+
+
+class ArticleStore:
+    """
+    Holds the parsed, date-sorted article list for the application.
+
+    Readers take `store.snapshot` and work with that object for the whole
+    request; reloads swap in a new snapshot atomically, so no locking is
+    needed on the read path.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0,
+                 related_path: Optional[str] = None, related_top_k: int = DEFAULT_TOP_K,
+                 reload_stamp: Optional[str] = None):
+        """
+        Args:
+            path (str): Location of the articles JSON file.
+            check_interval (float): Minimum number of seconds between two
+                stat() calls on the data file when checking for changes.
+            related_path (str): Optional file of precomputed related
+                articles (see perspective.related). Until it matches the
+                data version, the previous neighbours are kept.
+            related_top_k (int): Related articles kept per article; 0
+                disables the related-articles step.
+            reload_stamp (str): Optional file written by the rebuild
+                watcher once derived files are ready. While it exists, the
+                store reloads when the stamp changes rather than when the
+                data file does, so workers never load data whose related
+                articles are still being built.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.related_path = related_path
+        self.related_top_k = related_top_k
+        self.reload_stamp = reload_stamp
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._last_check = 0.0
+        # Data version still waiting for its related articles, and the
+        # related file's fingerprint when it was last tried.
+        self._related_pending: Optional[str] = None
+        self._related_key = None
+        self.snapshot: Optional[StoreSnapshot] = None
+        self.snapshot = self._load()
+
+    def _load(self) -> StoreSnapshot:
+        """Reads the data file and builds a new snapshot from it."""
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+                modified_at = os.fstat(f.fileno()).st_mtime
+            self._stat_key = self._file_stat_key()
+        except FileNotFoundError:
+            # Keep the application up with an empty blog rather than failing.
+            raw = b'{"articles": []}'
+            modified_at = None
+            self._stat_key = None
+
+        data = json.loads(raw.decode('utf-8'))
+        articles = [dict(a) for a in data.get('articles', [])]
+        # Compiled bodies from the previous snapshot, reused for every
+        # article whose source is unchanged; only edited ones are compiled.
+        compiled = {}
+        if self.snapshot is not None:
+            compiled = {(a['id'], a['revision']): a for a in self.snapshot.articles}
+        for article in articles:
+            # Identifies this version of the article's source fields, so
+            # per-article caches survive reloads that didn't touch it.
+            source = json.dumps(article, sort_keys=True).encode('utf-8')
+            article['revision'] = hashlib.sha1(source).hexdigest()[:12]
+            article['published'] = parse_article_date(article.get('date'))
+            previous = compiled.get((article.get('id'), article['revision']))
+            if previous is not None:
+                article.update((field, previous[field]) for field in COMPILED_FIELDS)
+            else:
+                compile_article(article)
+
+        # Newest first. Articles without a usable date sort to the end.
+        articles.sort(key=lambda a: a['published'] or date.min, reverse=True)
+
+        by_id = {}
+        for article in articles:
+            # Keep the newest article when an ID appears more than once.
+            by_id.setdefault(article['id'], article)
+
+        version = hashlib.sha1(raw).hexdigest()[:12]
+        if self._attach_related(articles, by_id, version):
+            self._related_pending = None
+        else:
+            logger.warning("%s is missing or out of date for data version %s; keeping the "
+                           "previous related articles until it is rebuilt", self.related_path, version)
+            self._related_pending = version
+            self._related_key = self._related_stat_key()
+            version += PROVISIONAL_SUFFIX
+        return StoreSnapshot(version, articles, by_id, time.time(), modified_at)
+
+    def _attach_related(self, articles, by_id, version) -> bool:
+        """
+        Stores each article's related articles in its 'related' key.
+
+        Returns:
+            bool: False if the precomputed neighbours were missing or stale;
+            the previous snapshot's neighbours are used meanwhile.
+        """
+        for article in articles:
+            article['related'] = []
+        if not self.related_top_k or not self.related_path:
+            return True
+        related = load_related(self.related_path, version)
+        if related is not None:
+            self._set_related(by_id, related)
+            return True
+        if self.snapshot is not None:
+            self._set_related(by_id, {article_id: [r['id'] for r in article['related']]
+                                      for article_id, article in self.snapshot.by_id.items()})
+        return False
+
+    def _set_related(self, by_id, related: Dict[str, List[str]]) -> None:
+        for article_id, article in by_id.items():
+            neighbours = [by_id[i] for i in related.get(article_id, []) if i in by_id]
+            article['related'] = neighbours[:self.related_top_k]
+
+    def _related_stat_key(self):
+        try:
+            st = os.stat(self.related_path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load_pending_related(self) -> bool:
+        """
+        Swaps in the related articles once related.json matches the data.
+
+        Called with the lock held. The file is only parsed when it changed
+        since the last attempt.
+
+        Returns:
+            bool: True if a completed snapshot replaced the provisional one.
+        """
+        stat_key = self._related_stat_key()
+        if stat_key is None or stat_key == self._related_key:
+            return False
+        self._related_key = stat_key
+        version = self._related_pending
+        related = load_related(self.related_path, version)
+        if related is None:
+            return False
+        snapshot = self.snapshot
+        # Copies, so requests still rendering the provisional snapshot never
+        # see its articles change.
+        articles = [dict(a) for a in snapshot.articles]
+        copies = {id(old): new for old, new in zip(snapshot.articles, articles)}
+        by_id = {article_id: copies[id(a)] for article_id, a in snapshot.by_id.items()}
+        self._set_related(by_id, related)
+        self.snapshot = snapshot._replace(version=version, articles=articles, by_id=by_id)
+        self._related_pending = None
+        return True
+
+    def _file_stat_key(self):
+        """Returns a cheap fingerprint of the data file for change detection."""
+        if self.reload_stamp:
+            try:
+                st = os.stat(self.reload_stamp)
+                return ('stamp', st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reloads the data file if it has changed since the last load.
+
+        The check is rate limited by `check_interval`, so calling this on
+        every request costs at most one stat() per interval (two while
+        waiting for related articles).
+
+        Returns:
+            bool: True if a new snapshot was loaded.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            try:
+                stat_key = self._file_stat_key()
+            except FileNotFoundError:
+                stat_key = None
+            if not force and stat_key == self._stat_key:
+                return self._related_pending is not None and self._load_pending_related()
+            self.snapshot = self._load()
+            return True
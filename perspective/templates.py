@@ -0,0 +1,148 @@
+"""
+Keeping Jinja template compilation out of worker startup.
+
+Jinja compiles each template to Python source and then to bytecode the
+first time a process renders it, so every new or recycled Gunicorn worker
+pays that cost again. Two things remove it:
+
+- A persistent bytecode cache (Jinja's FileSystemBytecodeCache). The first
+  process to compile a template stores its code object on disk; the others
+  load it. Entries are checked against a checksum of the template source,
+  so editing one template invalidates only that template's entry. Cached
+  bytecode is executed, so the directory must be private to the user the
+  server runs as (mode 0700, owned by that user); otherwise no cache is
+  used. A failure to read or write an entry is treated as a miss.
+- A precompiled bundle, built by `flask compile-templates`. It holds the
+  templates compiled to importable Python modules, plus a manifest of the
+  source hashes they were compiled from. BundleLoader serves a template
+  from the bundle only when its source hash still matches; a template
+  edited after the build falls back to normal compilation, and the
+  bytecode cache.
+"""
+
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Optional
+
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, ModuleLoader, TemplateNotFound
+from jinja2.bccache import Bucket
+
+from perspective.paths import private_directory
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+class SafeBytecodeCache(FileSystemBytecodeCache):
+    """A FileSystemBytecodeCache whose I/O errors are cache misses, not 500s."""
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        try:
+            super().load_bytecode(bucket)
+        except OSError:
+            pass
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+class BundleLoader(BaseLoader):
+    """Loads templates from a precompiled bundle while their source is unchanged."""
+
+    def __init__(self, bundle_dir: str, fallback: BaseLoader):
+        """
+        Args:
+            bundle_dir (str): Directory written by build_bundle().
+            fallback (BaseLoader): The application's normal template loader.
+        """
+        self.fallback = fallback
+        self.modules = ModuleLoader(bundle_dir)
+        self.bundle_hits = 0
+        try:
+            with open(os.path.join(bundle_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                self.manifest: Dict[str, str] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+    def get_source(self, environment, template):
+        return self.fallback.get_source(environment, template)
+
+    def list_templates(self):
+        return self.fallback.list_templates()
+
+    def load(self, environment, name, globals=None):
+        expected = self.manifest.get(name)
+        if expected is not None:
+            source, _, _ = self.fallback.get_source(environment, name)
+            if source_hash(source) == expected:
+                try:
+                    template = self.modules.load(environment, name, globals)
+                    self.bundle_hits += 1
+                    return template
+                except TemplateNotFound:
+                    pass
+        return self.fallback.load(environment, name, globals)
+
+
+def configure(env: Environment, cache_dir: Optional[str] = None,
+              bundle_dir: Optional[str] = None) -> None:
+    """
+    Installs the bytecode cache and, if present, the precompiled bundle.
+
+    Args:
+        env (Environment): The application's Jinja environment.
+        cache_dir (str): Directory for the bytecode cache. If unset, Jinja's
+            own per-user directory in the system temp directory is used;
+            if it is not private to this user, no cache is used.
+        bundle_dir (str): Bundle directory; ignored if it has no manifest.
+    """
+    if cache_dir:
+        try:
+            env.bytecode_cache = SafeBytecodeCache(private_directory(cache_dir))
+        except OSError:
+            pass
+    else:
+        try:
+            # Creates and checks _jinja2-cache-<uid> the same way.
+            env.bytecode_cache = SafeBytecodeCache()
+        except (OSError, RuntimeError):
+            pass
+    if bundle_dir and os.path.exists(os.path.join(bundle_dir, MANIFEST_FILE)):
+        env.loader = BundleLoader(bundle_dir, env.loader)
+
+
+def build_bundle(env: Environment, bundle_dir: str,
+                 log: Callable[[str], None] = lambda message: None) -> int:
+    """
+    Compiles every template into an importable module bundle.
+
+    The manifest is written last, so a running process that reads the
+    bundle mid-build only trusts modules that are complete.
+
+    Returns:
+        int: The number of templates compiled.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    loader = env.loader.fallback if isinstance(env.loader, BundleLoader) else env.loader
+    manifest = {}
+    for name in loader.list_templates():
+        source, filename, _ = loader.get_source(env, name)
+        code = env.compile(source, name, filename, raw=True, defer_init=True)
+        module_path = os.path.join(bundle_dir, ModuleLoader.get_module_filename(name))
+        with open(module_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(code)
+        os.replace(module_path + '.tmp', module_path)
+        manifest[name] = source_hash(source)
+        log(f'Compiled "{name}" as {os.path.basename(module_path)}')
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return len(manifest)
@@ -0,0 +1,188 @@
+"""
+Directory watching with inotify, falling back to polling.
+
+On Linux the watcher asks the kernel for change events through inotify
+(called via ctypes, so no extra dependency), which costs nothing while
+files are quiet. Elsewhere, or where inotify is unavailable, it compares
+(mtime, size) snapshots of the watched directories every `interval`
+seconds.
+
+Both watchers report the paths that changed; `wait_for_changes` adds
+debouncing, so an editor's save (write to a temp file, rename, chmod) or
+a batch of copied images arrives as one set of paths.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# inotify event masks (see inotify(7)).
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_ignored(path: str) -> bool:
+    """Skips hidden files, editor swap files and atomic-write temp files."""
+    name = os.path.basename(path)
+    return name.startswith('.') or name.endswith(('.tmp', '~', '.swp', '.swx'))
+
+
+class InotifyWatcher:
+    """Reports changes in a set of directories using Linux inotify."""
+
+    def __init__(self, directories: Iterable[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs: Dict[int, str] = {}
+        try:
+            for directory in directories:
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f'cannot watch {directory}')
+                self._dirs[wd] = directory
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def read(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Waits up to `timeout` seconds for events.
+
+        Returns:
+            set: Changed paths; a watched directory itself if the kernel
+            queue overflowed and individual events were lost.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                break
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            changed = self._parse(data)
+        return changed
+
+    def _parse(self, data: bytes) -> Set[str]:
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self._dirs.values())
+            elif wd in self._dirs and name:
+                path = os.path.join(self._dirs[wd], os.fsdecode(name))
+                if not is_ignored(path):
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Reports changes by comparing directory listings at an interval."""
+
+    def __init__(self, directories: Iterable[str], interval: float = 1.0):
+        self.directories = list(directories)
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_file() and not is_ignored(entry.path):
+                    st = entry.stat()
+                    state[entry.path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def read(self, timeout: Optional[float]) -> Set[str]:
+        """Waits up to `timeout` seconds (polling) and returns changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._scan()
+            old, self._state = self._state, state
+            changed = {p for p in old.keys() | state.keys() if old.get(p) != state.get(p)}
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(wait, 0))
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(directories: Iterable[str], poll: bool = False, interval: float = 1.0):
+    """
+    Returns an inotify watcher where possible, otherwise a polling one.
+
+    Args:
+        directories (list): Directories to watch (not recursive).
+        poll (bool): Force polling, e.g. for network file systems, where
+            inotify does not see changes made on other machines.
+        interval (float): Polling interval in seconds.
+    """
+    directories = list(directories)
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, interval)
+
+
+def wait_for_changes(watcher, debounce: float = 0.5, max_delay: float = 10.0) -> Set[str]:
+    """
+    Blocks until something changes, then until things have been quiet.
+
+    Args:
+        watcher: An InotifyWatcher or PollingWatcher.
+        debounce (float): Seconds without events that end a batch.
+        max_delay (float): Upper bound on how long a stream of events can
+            postpone the batch.
+
+    Returns:
+        set: All paths that changed in the batch.
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.read(None)
+    deadline = time.monotonic() + max_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return changed
+        more = watcher.read(min(debounce, remaining))
+        if not more:
+            return changed
+        changed |= more
@@ -0,0 +1,125 @@
+"""Sanitizing, heading detection and excerpts of the article content compiler."""
+
+import pytest
+
+from perspective.content import (classify_blocks, classify_paragraph, compile_article, make_excerpt,
+                                 sanitize_html, split_sentences)
+
+
+@pytest.mark.parametrize('probe', [
+    '<script>alert(1)</script>',
+    '<img src=x onerror=alert(1)>',
+    '<svg onload=alert(1)>',
+    '<a href="javascript:alert(1)">x</a>',
+    '<a href="&#106;avascript:alert(1)">x</a>',
+    '<a href=" JaVaScRiPt:alert(1)">x</a>',
+    '<a href="data:text/html,<script>alert(1)</script>">x</a>',
+    '<a href="/" onclick="alert(1)">x</a>',
+    '<strong style="background:url(javascript:alert(1))">x</strong>',
+    '<iframe src="https://evil.example/"></iframe>',
+    '<style>body{display:none}</style>',
+    '<<script>script>alert(1)<</script>/script>',
+])
+def test_xss_probes_are_neutralized(probe):
+    cleaned = sanitize_html(probe)
+    lowered = cleaned.lower()
+    for needle in ('<script', '<img', '<svg', '<iframe', '<style', 'javascript:', 'data:', 'onerror',
+                   'onload', 'onclick', 'style='):
+        assert needle not in lowered, cleaned
+
+
+def test_script_and_style_contents_are_dropped():
+    assert sanitize_html('before<script>var x = 1;</script>after') == 'beforeafter'
+    assert sanitize_html('a<style>p{}</style>b') == 'ab'
+
+
+def test_allowed_markup_is_kept():
+    cleaned = sanitize_html('<strong>bold</strong> <em>it</em> <a href="https://example.com/a?b=1&amp;c=2" '
+                            'title="T">link</a><br>')
+    assert cleaned == ('<strong>bold</strong> <em>it</em> <a href="https://example.com/a?b=1&amp;c=2" '
+                       'title="T" rel="noopener">link</a><br>')
+
+
+def test_unknown_tags_are_removed_but_their_text_is_kept():
+    assert sanitize_html('<span class="x">kept</span> <div>too</div>') == 'kept too'
+
+
+def test_text_is_escaped_and_nesting_repaired():
+    assert sanitize_html('1 < 2 & 3 > 2') == '1 &lt; 2 &amp; 3 &gt; 2'
+    assert sanitize_html('<strong><em>open') == '<strong><em>open</em></strong>'
+    assert sanitize_html('<strong><em>x</strong> y') == '<strong><em>x</em></strong> y'
+
+
+@pytest.mark.parametrize('line', [
+    'The Vibe in the Room',
+    'The Soul of a New Machine: The A350 from Seat 36L',
+    'A Brief Layover, A Shift in Perspective',
+    'Sources',
+    '## Why it matters',
+])
+def test_headings_are_detected(line):
+    assert classify_paragraph(line) == 'heading'
+
+
+@pytest.mark.parametrize('line', [
+    'I agree',
+    'OK',
+    'Thanks',
+    'Not bad at all',
+    'We landed in Nairobi at dawn.',
+    'Read the <strong>Full Story</strong>',
+    'A Heading That Runs On Far Too Long To Be A Heading Of Any Sort At All Really',
+])
+def test_short_lines_are_not_headings(line):
+    assert classify_paragraph(line) == 'body'
+
+
+def test_list_items_and_heading_markers_are_stripped():
+    blocks = classify_blocks(['## Further Reading', '* One', '- Two', 'Text.'])
+    assert [(b.kind, b.text) for b in blocks] == [
+        ('heading', 'Further Reading'), ('list_item', 'One'), ('list_item', 'Two'), ('body', 'Text.')]
+    assert blocks[0].anchor == 'further-reading'
+
+
+def test_duplicate_heading_anchors_are_numbered():
+    blocks = classify_blocks(['The Plan', 'The Plan'])
+    assert [b.anchor for b in blocks] == ['the-plan', 'the-plan-2']
+
+
+def test_sentences_do_not_split_after_abbreviations_or_initials():
+    assert split_sentences('We met Dr. Wanjiru at 9. She quoted J. K. Rowling, e.g. her essays. Done!') == [
+        'We met Dr. Wanjiru at 9.', 'She quoted J. K. Rowling, e.g. her essays.', 'Done!']
+    assert split_sentences('So did I. Then we left.') == ['So did I.', 'Then we left.']
+
+
+def test_excerpt_ends_on_a_sentence_boundary():
+    blocks = classify_blocks(['First sentence here. Second sentence is longer than the first. Third.'])
+    assert make_excerpt(blocks, max_chars=60) == 'First sentence here.'
+
+
+def test_excerpt_keeps_abbreviations_inside_the_sentence():
+    blocks = classify_blocks(['Mr. Otieno flew the route twice. It was late both times.'])
+    assert make_excerpt(blocks, max_chars=40) == 'Mr. Otieno flew the route twice.'
+
+
+def test_excerpt_cuts_an_overlong_first_sentence_at_a_word():
+    blocks = classify_blocks(['word ' * 100])
+    excerpt = make_excerpt(blocks, max_chars=30)
+    assert excerpt.endswith('…')
+    assert len(excerpt) <= 31
+    assert 'wor…' not in excerpt
+
+
+def test_excerpt_skips_headings():
+    blocks = classify_blocks(['The Vibe in the Room', 'Quiet. Then loud.'])
+    assert make_excerpt(blocks) == 'Quiet. Then loud.'
+
+
+def test_compile_article_sets_the_derived_fields():
+    article = {'content': ['A Digital Identity', 'It <script>x()</script>works. Yes.', '* Source one']}
+    compile_article(article)
+    assert str(article['body_html']) == ('<h2 id="a-digital-identity">A Digital Identity</h2>'
+                                         '<p>It works. Yes.</p><ul><li>Source one</li></ul>')
+    assert article['toc'] == [('a-digital-identity', 'A Digital Identity')]
+    assert article['excerpt'] == 'It works. Yes.'
+    assert article['reading_minutes'] == 1
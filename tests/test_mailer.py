@@ -0,0 +1,188 @@
+"""Retry behaviour of SMTPMailer against a stand-in for smtplib.SMTP, and a real session."""
+
+import shutil
+import smtplib
+import socket
+import ssl
+import subprocess
+from email.message import EmailMessage
+
+import pytest
+
+from perspective import mailer as mailer_module
+from perspective.mailer import SMTPMailer
+
+
+class FakeSMTP:
+    """Replays scripted outcomes for send_message(), one per call."""
+
+    # Shared by every connection the mailer opens during a test.
+    outcomes = []
+    instances = []
+    fail_starttls = False
+
+    def __init__(self, host, port, timeout=None):
+        self.closed = False
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        if FakeSMTP.fail_starttls:
+            raise smtplib.SMTPNotSupportedError('STARTTLS extension not supported by server.')
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return 250, b'OK'
+
+    def send_message(self, message):
+        outcome = FakeSMTP.outcomes.pop(0) if FakeSMTP.outcomes else None
+        if outcome is not None:
+            raise outcome
+        self.sent.append(message)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.outcomes = []
+    FakeSMTP.instances = []
+    FakeSMTP.fail_starttls = False
+    monkeypatch.setattr(mailer_module.smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+
+def make_mailer(sleeps):
+    return SMTPMailer('localhost', 25, starttls=True, max_retries=3, backoff=1.0, sleep=sleeps.append)
+
+
+def make_message():
+    message = EmailMessage()
+    message['To'] = 'editor@example.com'
+    message['From'] = 'blog@example.com'
+    message.set_content('Time to write.')
+    return message
+
+
+def test_disconnect_is_retried_on_a_new_connection(fake_smtp):
+    sleeps = []
+    fake_smtp.outcomes = [smtplib.SMTPServerDisconnected('gone'), ConnectionResetError()]
+    mailer = make_mailer(sleeps)
+    mailer.send(make_message())
+    assert sleeps == [1.0, 2.0]
+    assert mailer.connections_opened == 3
+    assert len(fake_smtp.instances[-1].sent) == 1
+
+
+def test_temporary_reply_is_retried_on_the_same_connection(fake_smtp):
+    sleeps = []
+    fake_smtp.outcomes = [smtplib.SMTPDataError(451, b'Try again later')]
+    mailer = make_mailer(sleeps)
+    mailer.send(make_message())
+    assert sleeps == [1.0]
+    assert mailer.connections_opened == 1
+
+
+def test_permanent_reply_is_not_retried(fake_smtp):
+    sleeps = []
+    fake_smtp.outcomes = [smtplib.SMTPDataError(554, b'Rejected')]
+    mailer = make_mailer(sleeps)
+    with pytest.raises(smtplib.SMTPDataError):
+        mailer.send(make_message())
+    assert sleeps == []
+
+
+def test_refused_recipients_are_not_retried(fake_smtp):
+    sleeps = []
+    refused = {'editor@example.com': (550, b'No such user')}
+    fake_smtp.outcomes = [smtplib.SMTPRecipientsRefused(refused)]
+    mailer = make_mailer(sleeps)
+    mailer.queue(make_message())
+    sent, failed = mailer.flush()
+    assert (sent, len(failed)) == (0, 1)
+    assert isinstance(failed[0][1], smtplib.SMTPRecipientsRefused)
+    assert sleeps == []
+    assert mailer.connections_opened == 1
+
+
+def test_retries_are_bounded(fake_smtp):
+    sleeps = []
+    fake_smtp.outcomes = [smtplib.SMTPServerDisconnected('gone')] * 4
+    mailer = make_mailer(sleeps)
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        mailer.send(make_message())
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_failed_session_setup_closes_the_connection(fake_smtp):
+    sleeps = []
+    fake_smtp.fail_starttls = True
+    mailer = make_mailer(sleeps)
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        mailer.send(make_message())
+    assert sleeps == []
+    assert fake_smtp.instances[0].closed
+
+
+class RecordingHandler:
+    """aiosmtpd handler that keeps every accepted message."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((session.ssl is not None, session.authenticated, envelope))
+        return '250 OK'
+
+
+@pytest.fixture
+def smtp_server(tmp_path):
+    controller_module = pytest.importorskip('aiosmtpd.controller')
+    from aiosmtpd.smtp import AuthResult
+    openssl = shutil.which('openssl')
+    if openssl is None:
+        pytest.skip('openssl is needed to make a certificate for STARTTLS')
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run([openssl, 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-keyout', str(key), '-out', str(cert)],
+                   check=True, capture_output=True)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(str(cert), str(key))
+
+    def authenticator(server, session, envelope, mechanism, auth_data):
+        return AuthResult(success=(auth_data.login, auth_data.password) == (b'blog', b'secret'))
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = controller_module.Controller(
+        handler, hostname='127.0.0.1', port=port, tls_context=context, require_starttls=True,
+        authenticator=authenticator, auth_required=True)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+def test_session_with_starttls_and_login_against_a_real_server(smtp_server):
+    handler, port = smtp_server
+    mailer = SMTPMailer('127.0.0.1', port, username='blog', password='secret', timeout=5)
+    try:
+        mailer.queue(make_message())
+        mailer.queue(make_message())
+        sent, failed = mailer.flush()
+    finally:
+        mailer.close()
+    assert (sent, failed) == (2, [])
+    assert mailer.connections_opened == 1
+    assert [(tls, authenticated) for tls, authenticated, _ in handler.messages] == [(True, True)] * 2
+    assert handler.messages[0][2].rcpt_tos == ['editor@example.com']
+
@@ -9,13 +9,17 @@ import os
 import json
 import random
 import textwrap
-from PIL import Image, ImageDraw, ImageFont
+
+# Pillow is imported inside the functions that draw, so tools that only
+# need image_path() (the scheduler daemon, the rebuild watcher) start
+# without it.
 
 def find_font(preferred_fonts, default_size=72):
     """
     Finds an available TrueType font from a list of common system paths.
     This makes the script more portable across different operating systems.
     """
+    from PIL import ImageFont
     font_paths = [
         "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
         "C:\\Windows\\Fonts\\Verdana.ttf",
@@ -109,6 +113,7 @@ def create_generative_art_image(title, subtitle, category, color_start, color_en
     """
     Creates a complete generative art image with background and text.
     """
+    from PIL import Image, ImageDraw
     img = Image.new('RGB', size, 'white')
     draw = ImageDraw.Draw(img, 'RGBA')
 
@@ -143,6 +148,44 @@ def create_generative_art_image(title, subtitle, category, color_start, color_en
 
     return img.convert('RGB')
 
+COLOR_PALETTE = {
+    'Networks':   ((20, 80, 120), (40, 120, 180)),
+    'Automotive': ((100, 80, 60), (140, 110, 90)),
+    'Aviation':   ((60, 70, 80), (110, 120, 130)),
+    'Linux':      ((200, 80, 40), (230, 120, 60)),
+    'Python':     ((50, 100, 150), (80, 130, 190)),
+    'Embedded':   ((70, 70, 70), (110, 110, 110)),
+    'default':    ((80, 80, 80), (120, 120, 120))
+}
+
+def image_path(article, output_dir='static/images'):
+    """
+    Returns where the header image for an article is stored.
+    """
+    return os.path.join(output_dir, article.get('image', f"{article['id']}.jpg"))
+
+def render_article_image(article, output_dir='static/images'):
+    """
+    Generates and saves the header image for one article.
+    Returns the path of the saved image.
+    """
+    title = article.get('title', 'Untitled')
+    category = article.get('category', 'General')
+    
+    colors = COLOR_PALETTE.get(category, COLOR_PALETTE['default'])
+    
+    img = create_generative_art_image(
+        title=title,
+        subtitle=category,
+        category=category,
+        color_start=colors[0],
+        color_end=colors[1]
+    )
+    
+    save_path = image_path(article, output_dir)
+    img.save(save_path, 'JPEG', quality=90)
+    return save_path
+
 def main():
     """
     Main function to generate and save all word art images.
@@ -157,35 +200,10 @@ def main():
         print("Error: 'data/articles.json' not found. Cannot generate images.")
         return
 
-    color_palette = {
-        'Networks':   ((20, 80, 120), (40, 120, 180)),
-        'Automotive': ((100, 80, 60), (140, 110, 90)),
-        'Aviation':   ((60, 70, 80), (110, 120, 130)),
-        'Linux':      ((200, 80, 40), (230, 120, 60)),
-        'Python':     ((50, 100, 150), (80, 130, 190)),
-        'Embedded':   ((70, 70, 70), (110, 110, 110)),
-        'default':    ((80, 80, 80), (120, 120, 120))
-    }
-
     print("🎨 Generating new artistic images with robust error handling...")
     for article in articles:
-        filename = article.get('image', f"{article['id']}.jpg")
-        title = article.get('title', 'Untitled')
-        category = article.get('category', 'General')
-        
-        colors = color_palette.get(category, color_palette['default'])
-        
-        img = create_generative_art_image(
-            title=title,
-            subtitle=category,
-            category=category,
-            color_start=colors[0],
-            color_end=colors[1]
-        )
-        
-        save_path = os.path.join(output_dir, filename)
-        img.save(save_path, 'JPEG', quality=90)
-        print(f"✅ Created '{save_path}' for article '{title}'")
+        save_path = render_article_image(article, output_dir)
+        print(f"✅ Created '{save_path}' for article '{article.get('title', 'Untitled')}'")
     
     print("\n✨ All artistic images generated successfully!")
 
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Rebuild Watcher for Daudi's Blog
+Watches data/ and static/images/ and rebuilds only the files a change
+affects, then tells the running app to switch to the new data version.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow imports from the project root when run as `python utils/rebuild_watcher.py`.
+sys.path.insert(0, ROOT)
+from perspective.related import build_related, load_related, save_related
+from perspective.sitemap import export_sitemaps
+from perspective.store import ArticleStore, StoreSnapshot
+from perspective.watcher import open_watcher, wait_for_changes
+
+# Derived files, in the order they are rebuilt. 'reload' comes last so the
+# app only switches once everything else matches the new data.
+RELATED = 'related'
+IMAGES = 'images'
+SITEMAP = 'sitemap'
+SUMMARY = 'summary'
+RELOAD = 'reload'
+ARTIFACTS = [RELATED, IMAGES, SITEMAP, SUMMARY, RELOAD]
+
+# Header images this pipeline generated, with a hash of each file as
+# written. Only those, still unmodified, are ever regenerated; any other
+# file in the image directory (e.g. a photo) is never overwritten.
+GENERATED_MANIFEST = '.generated.json'
+
+def file_hash(path: str) -> str:
+    """SHA-1 of a file's contents"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class RebuildPipeline:
+    def __init__(self, articles_file: str, image_dir: str, reload_stamp: str):
+        self.articles_file = os.path.abspath(articles_file)
+        self.data_dir = os.path.dirname(self.articles_file)
+        self.image_dir = os.path.abspath(image_dir)
+        self.reload_stamp = reload_stamp
+        self.related_file = os.path.join(self.data_dir, 'related.json')
+        self.site_url = os.environ.get('SITE_URL')
+        self.sitemap_dir = os.environ.get('SITEMAP_EXPORT_DIR')
+        # The watcher reads the data file directly, never through the stamp.
+        self.store = ArticleStore(self.articles_file, check_interval=0, related_top_k=0)
+        self._image_sources = self.image_sources(self.store.snapshot)
+
+    @property
+    def directories(self) -> List[str]:
+        """Directories to watch"""
+        return [self.data_dir, self.image_dir]
+
+    def affected(self, changed_paths: Iterable[str]) -> Set[str]:
+        """Map changed paths to the derived files that need rebuilding"""
+        artifacts = set()
+        for path in map(os.path.abspath, changed_paths):
+            if path == self.articles_file or path == self.data_dir:
+                # The data file itself, or a lost-events marker for data/.
+                artifacts.update(ARTIFACTS)
+            elif path == self.image_dir or os.path.dirname(path) == self.image_dir:
+                # A header image was removed or replaced; regenerate missing ones.
+                artifacts.add(IMAGES)
+        return artifacts
+
+    @staticmethod
+    def image_sources(snapshot: StoreSnapshot) -> Dict[str, Any]:
+        """The fields each generated header image is drawn from"""
+        return {
+            article_id: (article.get('title'), article.get('category'), article.get('image'))
+            for article_id, article in snapshot.by_id.items()
+        }
+
+    def rebuild(self, artifacts: Set[str]) -> None:
+        """Rebuild the given artifacts in dependency order"""
+        try:
+            # A stat() per batch; the file is only parsed if it changed.
+            self.store.refresh()
+        except ValueError as e:
+            # Most likely a half-saved file; the next save triggers again.
+            print(f"Skipping rebuild, {self.articles_file} is not valid JSON: {e}")
+            return
+        snapshot = self.store.snapshot
+        for artifact in ARTIFACTS:
+            if artifact in artifacts:
+                started = time.perf_counter()
+                if getattr(self, f'build_{artifact}')(snapshot):
+                    print(f"Rebuilt {artifact} for data version {snapshot.version} "
+                          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def build_related(self, snapshot: StoreSnapshot) -> bool:
+        """Precompute related articles (data/related.json) for this version"""
+        if load_related(self.related_file, snapshot.version) is not None:
+            return False
+        try:
+            related = build_related(list(snapshot.by_id.values()))
+        except ImportError as e:
+            print(f"Not building related articles: {e}")
+            return False
+        save_related(self.related_file, snapshot.version, related)
+        return True
+
+    def build_images(self, snapshot: StoreSnapshot) -> bool:
+        """Generate missing header images, and refresh generated ones for retitled articles"""
+        import create_wordart
+        sources = self.image_sources(snapshot)
+        generated = self.load_generated()
+        created = 0
+        try:
+            for article_id, article in snapshot.by_id.items():
+                path = create_wordart.image_path(article, self.image_dir)
+                name = os.path.relpath(path, self.image_dir)
+                if os.path.exists(path):
+                    # Existing files are only replaced if this pipeline wrote
+                    # them and nobody has changed them since.
+                    if sources[article_id] == self._image_sources.get(article_id):
+                        continue
+                    if name not in generated or file_hash(path) != generated[name]:
+                        continue
+                create_wordart.render_article_image(article, self.image_dir)
+                generated[name] = file_hash(path)
+                created += 1
+        except ImportError as e:
+            print(f"Not generating header images: {e}")
+            return False
+        finally:
+            if created:
+                self.save_generated(generated)
+        self._image_sources = sources
+        return created > 0
+
+    def load_generated(self) -> Dict[str, str]:
+        """Read the manifest of generated header images"""
+        try:
+            with open(os.path.join(self.image_dir, GENERATED_MANIFEST), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_generated(self, generated: Dict[str, str]) -> None:
+        """Write the manifest of generated header images atomically"""
+        manifest_file = os.path.join(self.image_dir, GENERATED_MANIFEST)
+        with open(f"{manifest_file}.tmp", 'w') as f:
+            json.dump(generated, f, indent=2, sort_keys=True)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+
+    def build_sitemap(self, snapshot: StoreSnapshot) -> bool:
+        """Re-export the static sitemap, if an export directory is configured"""
+        if not (self.site_url and self.sitemap_dir):
+            return False
+        return export_sitemaps(list(snapshot.by_id.values()), self.site_url.rstrip('/') + '/',
+                               self.sitemap_dir, snapshot.version)
+
+    def build_summary(self, snapshot: StoreSnapshot) -> bool:
+        """Refresh the weekly scheduler's statistics snapshot"""
+        from weekly_scheduler import WeeklyScheduler
+        WeeklyScheduler(self.articles_file).summary
+        return True
+
+    def build_reload(self, snapshot: StoreSnapshot) -> bool:
+        """Write the reload stamp; app workers switch to the new version on it"""
+        try:
+            with open(self.reload_stamp, 'r') as f:
+                if f.read().strip() == snapshot.version:
+                    return False
+        except FileNotFoundError:
+            pass
+        tmp_file = f"{self.reload_stamp}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(snapshot.version)
+        os.replace(tmp_file, self.reload_stamp)
+        return True
+
+    def watch(self, poll: bool = False) -> None:
+        """Rebuild affected artifacts whenever the watched files change"""
+        watcher = open_watcher(self.directories, poll=poll)
+        print(f"Watching {', '.join(self.directories)} with {type(watcher).__name__}")
+        try:
+            while True:
+                changed = wait_for_changes(watcher)
+                artifacts = self.affected(changed)
+                if artifacts:
+                    self.rebuild(artifacts)
+        finally:
+            watcher.close()
+
+def main():
+    """Main function for command-line usage"""
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    command = args[0] if args else 'watch'
+    pipeline = RebuildPipeline(
+        os.path.join(ROOT, 'data', 'articles.json'),
+        os.environ.get('IMAGE_DIR', os.path.join(ROOT, 'static', 'images')),
+        os.environ.get('RELOAD_STAMP', os.path.join(ROOT, 'data', '.reload-stamp')),
+    )
+
+    if command not in ('once', 'watch'):
+        print("Usage:")
+        print("  python rebuild_watcher.py once           - Bring all derived files up to date")
+        print("  python rebuild_watcher.py watch [--poll] - Keep them up to date as files change")
+        return
+
+    # Catch up on anything that changed while the watcher was not running.
+    pipeline.rebuild(set(ARTIFACTS))
+    if command == 'watch':
+        try:
+            pipeline.watch(poll='--poll' in sys.argv)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,93 @@ This script helps manage weekly article updates and reminders.
 import json
 import os
 import sys
-import smtplib
+import hashlib
 from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+# Allow imports from the project root when run as `python utils/weekly_scheduler.py`.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mail, HTTP, the article store and the daemon's machinery are imported by
+# the code that uses them, so `check` and `stats` (run from cron) start
+# quickly when the statistics summary is current.
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+    from perspective.mailer import SMTPMailer
+
+# Gaps between consecutive articles are counted in these buckets (days).
+CADENCE_BUCKETS = [(0, 6, '0-6 days'), (7, 13, '7-13 days'), (14, 29, '14-29 days'), (30, None, '30+ days')]
+SUMMARY_FORMAT = 1
+
+def summary_file_for(articles_file: str) -> str:
+    """The summary snapshot lives next to the data file it describes."""
+    return os.path.join(os.path.dirname(articles_file) or '.', '.scheduler_summary.json')
+
+def build_summary(articles_data: Dict[str, Any], version: str) -> Dict[str, Any]:
+    """
+    Builds the blog statistics in a single pass over the articles.
+    
+    Every date is parsed once; the result holds everything the CLI
+    commands need, so they never walk the articles themselves.
+    """
+    from perspective.store import parse_article_date
+    counts: Dict[str, int] = {}
+    latest_per_category: Dict[str, str] = {}
+    dates = []
+    undated = 0
+    for article in articles_data.get('articles', []):
+        category = article.get('category', 'Uncategorized')
+        counts[category] = counts.get(category, 0) + 1
+        published = parse_article_date(article.get('date'))
+        if published is None:
+            undated += 1
+            continue
+        dates.append(published)
+        iso = published.isoformat()
+        if iso > latest_per_category.get(category, ''):
+            latest_per_category[category] = iso
+    
+    dates = sorted(set(dates))
+    gaps = [(later - earlier).days for earlier, later in zip(dates, dates[1:])]
+    cadence = {label: 0 for _, _, label in CADENCE_BUCKETS}
+    for gap in gaps:
+        for low, high, label in CADENCE_BUCKETS:
+            if gap >= low and (high is None or gap <= high):
+                cadence[label] += 1
+                break
+    
+    return {
+        'format': SUMMARY_FORMAT,
+        'data_version': version,
+        'article_count': len(articles_data.get('articles', [])),
+        'undated_count': undated,
+        'latest_date': dates[-1].isoformat() if dates else None,
+        'categories': sorted(counts),
+        'count_per_category': counts,
+        'latest_per_category': latest_per_category,
+        'cadence': cadence,
+        'longest_gap_days': max(gaps) if gaps else None,
+        'average_gap_days': round(sum(gaps) / len(gaps), 1) if gaps else None,
+    }
 
 class WeeklyScheduler:
     def __init__(self, articles_file: str = 'data/articles.json'):
         self.articles_file = articles_file
-        self.articles_data = self.load_articles()
+        self.summary_file = summary_file_for(articles_file)
+        self._articles_data = None
+        self._summary = None
+    
+    def refresh(self) -> None:
+        """Forget loaded data so the next access sees the current file"""
+        self._articles_data = None
+        self._summary = None
+    
+    @property
+    def articles_data(self) -> Dict[str, Any]:
+        """The parsed articles file, loaded only when something needs it"""
+        if self._articles_data is None:
+            self._articles_data = self.load_articles()
+        return self._articles_data
     
     def load_articles(self) -> Dict[str, Any]:
         """Load articles from JSON file"""
@@ -26,21 +103,61 @@ class WeeklyScheduler:
         except FileNotFoundError:
             return {"articles": []}
     
+    def _source_key(self):
+        """Cheap fingerprint of the articles file (mtime and size)"""
+        try:
+            st = os.stat(self.articles_file)
+            return [st.st_mtime_ns, st.st_size]
+        except FileNotFoundError:
+            return None
+    
+    @property
+    def summary(self) -> Dict[str, Any]:
+        """
+        Blog statistics, rebuilt only when the articles file has changed.
+        
+        The snapshot is persisted next to the data file together with the
+        file's mtime and size, so repeated cron invocations cost one stat()
+        and one small read when nothing has changed.
+        """
+        if self._summary is not None:
+            return self._summary
+        source = self._source_key()
+        try:
+            with open(self.summary_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get('source') == source and cached.get('format') == SUMMARY_FORMAT:
+                self._summary = cached
+                return cached
+        except (FileNotFoundError, ValueError):
+            pass
+        
+        try:
+            with open(self.articles_file, 'rb') as f:
+                raw = f.read()
+            self._articles_data = json.loads(raw.decode('utf-8'))
+        except FileNotFoundError:
+            raw = b''
+            self._articles_data = {"articles": []}
+        summary = build_summary(self._articles_data, hashlib.sha1(raw).hexdigest()[:12])
+        summary['source'] = source
+        self._summary = summary
+        try:
+            tmp_file = f"{self.summary_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(summary, f, indent=2)
+            os.replace(tmp_file, self.summary_file)
+        except OSError:
+            # A read-only data directory only costs us the caching.
+            pass
+        return summary
+    
     def get_latest_article_date(self) -> datetime:
         """Get the date of the most recent article"""
-        if not self.articles_data['articles']:
+        latest = self.summary['latest_date']
+        if latest is None:
             return datetime.now() - timedelta(weeks=4)
-        
-        latest_date = None
-        for article in self.articles_data['articles']:
-            try:
-                article_date = datetime.strptime(article['date'], '%B %d, %Y')
-                if latest_date is None or article_date > latest_date:
-                    latest_date = article_date
-            except ValueError:
-                continue
-        
-        return latest_date or datetime.now() - timedelta(weeks=4)
+        return datetime.strptime(latest, '%Y-%m-%d')
     
     def days_since_last_article(self) -> int:
         """Calculate days since the last article was published"""
@@ -54,9 +171,7 @@ class WeeklyScheduler:
     
     def generate_article_ideas(self) -> List[str]:
         """Generate article ideas based on existing categories"""
-        categories = set()
-        for article in self.articles_data['articles']:
-            categories.add(article['category'])
+        categories = self.summary['categories']
         
         ideas = {
             'Networks': [
@@ -108,7 +223,7 @@ class WeeklyScheduler:
         """Create content for weekly reminder"""
         days_since = self.days_since_last_article()
         latest_date = self.get_latest_article_date()
-        article_count = len(self.articles_data['articles'])
+        article_count = self.summary['article_count']
         ideas = self.generate_article_ideas()
         
         content = f"""
@@ -150,46 +265,174 @@ Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
 """
         return content
     
-    def send_email_reminder(self, to_email: str, smtp_config: Dict[str, str]) -> bool:
-        """Send email reminder (optional feature)"""
+    def build_reminder_message(self, to_email: str, from_email: str) -> 'MIMEMultipart':
+        """Build the reminder email"""
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        msg = MIMEMultipart()
+        msg['From'] = from_email
+        msg['To'] = to_email
+        msg['Subject'] = f"Weekly Blog Reminder - {datetime.now().strftime('%B %d, %Y')}"
+        
+        msg.attach(MIMEText(self.create_reminder_content(), 'plain'))
+        return msg
+    
+    def send_email_reminder(self, to_email: str, smtp_config: Dict[str, str],
+                            mailer: Optional['SMTPMailer'] = None) -> bool:
+        """
+        Send email reminder (optional feature)
+        
+        Pass a long-lived mailer to reuse its SMTP session; otherwise one is
+        opened for this message and closed again.
+        """
+        from perspective.mailer import SMTPMailer
+        own_mailer = mailer is None
+        if own_mailer:
+            mailer = SMTPMailer(
+                smtp_config['smtp_server'],
+                int(smtp_config['smtp_port']),
+                username=smtp_config.get('username'),
+                password=smtp_config.get('password'),
+                starttls=smtp_config.get('starttls', True),
+            )
         try:
-            content = self.create_reminder_content()
-            
-            msg = MIMEMultipart()
-            msg['From'] = smtp_config['from_email']
-            msg['To'] = to_email
-            msg['Subject'] = f"Weekly Blog Reminder - {datetime.now().strftime('%B %d, %Y')}"
-            
-            msg.attach(MIMEText(content, 'plain'))
-            
-            server = smtplib.SMTP(smtp_config['smtp_server'], smtp_config['smtp_port'])
-            server.starttls()
-            server.login(smtp_config['username'], smtp_config['password'])
-            server.send_message(msg)
-            server.quit()
-            
+            mailer.send(self.build_reminder_message(to_email, smtp_config['from_email']))
             return True
         except Exception as e:
             print(f"Failed to send email: {e}")
             return False
+        finally:
+            if own_mailer:
+                mailer.close()
     
     def log_reminder(self, log_file: str = '/var/log/blog_reminders.log') -> None:
-        """Log reminder to file"""
+        """Log reminder to file as a structured JSON line"""
+        from perspective.jsonlog import JSONLinesLogger
+        logger = JSONLinesLogger(log_file, policy='block')
         try:
-            content = self.create_reminder_content()
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            with open(log_file, 'a') as f:
-                f.write(f"\n{'='*50}\n")
-                f.write(f"REMINDER: {timestamp}\n")
-                f.write(f"{'='*50}\n")
-                f.write(content)
-                f.write(f"\n{'='*50}\n\n")
-            
+            logger.log({
+                'event': 'reminder',
+                'should_remind': self.should_remind(),
+                'days_since_last_article': self.days_since_last_article(),
+                'article_count': self.summary['article_count'],
+                'content': self.create_reminder_content(),
+            })
+            logger.close()
+            if logger.last_error is not None:
+                raise logger.last_error
             print(f"Reminder logged to {log_file}")
         except Exception as e:
             print(f"Failed to log reminder: {e}")
 
+# Paths requested by the warmup job, relative to WARMUP_URL.
+WARMUP_PATHS = ['', 'feed.xml', 'atom.xml', 'feed.json', 'sitemap.xml', 'api/articles']
+
+def env_seconds(name: str, default: float) -> float:
+    """Read an interval in seconds from the environment (0 disables the job)"""
+    return float(os.environ.get(name, default))
+
+def mailer_from_env() -> Optional['SMTPMailer']:
+    """Create the daemon's mailer from SMTP_* settings, if configured"""
+    from perspective.mailer import SMTPMailer
+    host = os.environ.get('SMTP_SERVER')
+    if not host:
+        return None
+    return SMTPMailer(
+        host,
+        int(os.environ.get('SMTP_PORT', 587)),
+        username=os.environ.get('SMTP_USERNAME'),
+        password=os.environ.get('SMTP_PASSWORD'),
+        starttls=os.environ.get('SMTP_STARTTLS', '1') == '1',
+    )
+
+def run_daemon(scheduler: WeeklyScheduler) -> None:
+    """
+    Run the recurring blog jobs in one long-lived process.
+    
+    Replaces the cron entries: reminders, missing header images, the static
+    sitemap export and cache warmups each run on their own interval (set via
+    environment variables; an interval of 0 disables a job). Reminder
+    emails go out in one batch over a single reused SMTP session.
+    """
+    import signal
+    import urllib.request
+    from perspective.scheduler import JobScheduler
+    
+    jobs = JobScheduler()
+    mailer = mailer_from_env()
+    recipients = [r.strip() for r in os.environ.get('REMINDER_TO', '').split(',') if r.strip()]
+    from_email = os.environ.get('SMTP_FROM', 'blog@localhost')
+    state = {'reminded_for': None}
+    
+    def remind():
+        scheduler.refresh()
+        if not scheduler.should_remind():
+            return
+        # One reminder per stale article, not one per check.
+        latest = scheduler.summary['latest_date']
+        if state['reminded_for'] == latest:
+            return
+        if mailer and recipients:
+            for to_email in recipients:
+                mailer.queue(scheduler.build_reminder_message(to_email, from_email))
+            sent, failed = mailer.flush()
+            for message, error in failed:
+                print(f"Failed to send reminder to {message['To']}: {error}")
+            print(f"Sent {sent} reminder(s) over {mailer.connections_opened} SMTP connection(s) so far")
+            if not sent:
+                # Nothing was delivered; try again at the next check.
+                return
+        scheduler.log_reminder(os.environ.get('REMINDER_LOG', '/var/log/blog_reminders.log'))
+        state['reminded_for'] = latest
+    
+    def rebuild_images():
+        import create_wordart
+        output_dir = os.environ.get('IMAGE_DIR', 'static/images')
+        scheduler.refresh()
+        for article in scheduler.articles_data.get('articles', []):
+            if not os.path.exists(create_wordart.image_path(article, output_dir)):
+                print(f"Created {create_wordart.render_article_image(article, output_dir)}")
+    
+    def export_static():
+        from perspective.sitemap import export_sitemaps
+        from perspective.store import ArticleStore
+        base_url = os.environ['SITE_URL'].rstrip('/') + '/'
+        snapshot = ArticleStore(scheduler.articles_file, related_top_k=0).snapshot
+        output_dir = os.environ['SITEMAP_EXPORT_DIR']
+        if export_sitemaps(list(snapshot.by_id.values()), base_url, output_dir, snapshot.version):
+            print(f"Sitemap for data version {snapshot.version} written to {output_dir}")
+    
+    def warm_caches():
+        base_url = os.environ['WARMUP_URL'].rstrip('/') + '/'
+        for path in WARMUP_PATHS:
+            request = urllib.request.Request(base_url + path, headers={'Accept-Encoding': 'br, gzip'})
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+            except OSError as e:
+                print(f"Warmup of /{path} failed: {e}")
+    
+    schedule = [
+        ('reminder', env_seconds('REMINDER_INTERVAL', 3600), remind, True),
+        ('images', env_seconds('IMAGE_INTERVAL', 600), rebuild_images, True),
+        ('static-export', env_seconds('EXPORT_INTERVAL', 600), export_static,
+         bool(os.environ.get('SITEMAP_EXPORT_DIR') and os.environ.get('SITE_URL'))),
+        ('warmup', env_seconds('WARMUP_INTERVAL', 900), warm_caches, bool(os.environ.get('WARMUP_URL'))),
+    ]
+    for name, interval, func, enabled in schedule:
+        if enabled and interval > 0:
+            jobs.every(name, interval, func)
+            print(f"Scheduled {name} every {interval:g}s")
+    
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: jobs.stop())
+    try:
+        jobs.run_forever()
+    finally:
+        if mailer:
+            mailer.close()
+
 def main():
     """Main function for command-line usage"""
     scheduler = WeeklyScheduler()
@@ -200,6 +443,7 @@ def main():
         print("  python weekly_scheduler.py remind    - Generate reminder content")
         print("  python weekly_scheduler.py log       - Log reminder to file")
         print("  python weekly_scheduler.py stats     - Show blog statistics")
+        print("  python weekly_scheduler.py daemon    - Run recurring jobs until stopped")
         return
     
     command = sys.argv[1]
@@ -220,15 +464,27 @@ def main():
         scheduler.log_reminder()
     
     elif command == "stats":
+        summary = scheduler.summary
         days_since = scheduler.days_since_last_article()
         latest_date = scheduler.get_latest_article_date()
-        article_count = len(scheduler.articles_data['articles'])
         
         print(f"Blog Statistics:")
-        print(f"  Total Articles: {article_count}")
+        print(f"  Total Articles: {summary['article_count']}")
         print(f"  Last Article: {latest_date.strftime('%B %d, %Y')}")
         print(f"  Days Since: {days_since}")
-        print(f"  Status: {'⚠️ Needs Update' if scheduler.should_remind() else '✅ Current'}")
+        print(f"  Status: {'⚠️ Needs Update' if days_since >= 7 else '✅ Current'}")
+        print(f"  Data Version: {summary['data_version']}")
+        print(f"  Average Gap: {summary['average_gap_days']} days (longest {summary['longest_gap_days']})")
+        print(f"  Cadence:")
+        for label, count in summary['cadence'].items():
+            print(f"    {label}: {count}")
+        print(f"  By Category:")
+        for category in summary['categories']:
+            latest = summary['latest_per_category'].get(category, 'undated')
+            print(f"    {category}: {summary['count_per_category'][category]} (latest {latest})")
+    
+    elif command == "daemon":
+        run_daemon(scheduler)
     
     else:
         print(f"Unknown command: {command}")